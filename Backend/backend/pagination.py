@@ -0,0 +1,123 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+# --- Cursor Pagination (Opsional) ---
+# Cursor stabil walaupun ada data baru masuk di tengah-tengah paging.
+# Pagination hanya aktif kalau client mengirim ?page_size= atau ?cursor=.
+# Tabel di frontend (Data Barang, Barang Masuk/Keluar) selalu mengirim page_size
+# (lihat hooks/useCursorPage.js); list biasa hanya untuk pilihan produk di form,
+# cetak per bulan (?start=&end=) dan client lama.
+#
+# Keyset, bukan offset: cursor berisi nilai SEMUA kolom urutan baris terakhir
+# (+ id sebagai pemutus seri), halaman berikutnya = WHERE (date, created_at, id) < (...).
+# CursorPagination bawaan DRF hanya memakai kolom pertama (+ offset), jadi ratusan
+# transaksi bertanggal sama bisa terulang/terlewat saat ada data baru di antara halaman.
+# Kolom urutan (ordering_fields view) harus NOT NULL.
+class OptionalCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.request = request
+        self.ordering = self.unique_ordering(self.get_ordering(request, queryset, view))
+        position, reverse = self.decode_cursor(request)
+
+        # Mundur (Previous) = ambil dengan urutan terbalik, lalu balik lagi hasilnya
+        order = [self.flip(key) for key in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(order, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.page = rows
+        return rows
+
+    def unique_ordering(self, ordering):
+        # id sebagai kolom terakhir: posisi setiap baris jadi unik
+        fields = [key.lstrip('-') for key in ordering]
+        if 'id' in fields or 'pk' in fields:
+            return tuple(ordering)
+        return (*ordering, '-id' if ordering[0].startswith('-') else 'id')
+
+    @staticmethod
+    def flip(key):
+        return key[1:] if key.startswith('-') else '-' + key
+
+    @staticmethod
+    def after(order, position):
+        # (a, b, c) sesudah (x, y, z) = a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z)
+        # (">" jadi "<" untuk kolom descending)
+        condition = Q()
+        for index, key in enumerate(order):
+            equal = {prev.lstrip('-'): value for prev, value in zip(order[:index], position)}
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f"{key.lstrip('-')}__{lookup}": position[index]})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            ordering, position, reverse = cursor['o'], cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursor dari urutan lain (?ordering= diganti) tidak berlaku
+        if ordering != list(self.ordering) or not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        position = [self.to_cursor_value(getattr(row, key.lstrip('-'))) for key in self.ordering]
+        cursor = {'o': list(self.ordering), 'p': position}
+        if reverse:
+            cursor['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def to_cursor_value(value):
+        # Presisi penuh (mikrodetik) supaya perbandingan "=" di kolom pertama tetap tepat
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -87,7 +87,87 @@ DATABASES = {
 # Jika terdeteksi ada DATABASE_URL (Environment Variable dari Railway), pakai PostgreSQL
 database_url = os.environ.get("DATABASE_URL")
 if database_url:
-    DATABASES['default'] = dj_database_url.parse(database_url)
+    # Server jalan sebagai ASGI (Procfile): tiap request sync dilayani thread baru, jadi
+    # koneksi persisten per thread tidak pernah dipakai ulang dan hanya menumpuk.
+    # Default 0 (tutup di akhir request); pakai pooler (PgBouncer) kalau biaya connect terasa.
+    # CONN_MAX_AGE > 0 hanya untuk deploy WSGI (gunicorn) dengan worker thread tetap.
+    DATABASES['default'] = dj_database_url.parse(
+        database_url, conn_max_age=int(os.environ.get('CONN_MAX_AGE', 0)), conn_health_checks=True
+    )
+
+
+# --- CACHE ---
+# Default pakai memori lokal (cukup untuk 1 worker gunicorn & untuk test).
+# Kalau worker lebih dari satu, set REDIS_URL supaya semua worker berbagi cache
+# (dan counter generation inventory) yang sama.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Bucket pembatas login punya cache sendiri: banjir username/IP acak tidak bisa
+    # menggusur (= mereset) bucket lain, dan tidak ikut menggusur cache inventory.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+redis_url = os.environ.get("REDIS_URL")
+if redis_url:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': redis_url,
+    }
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': redis_url,
+        'KEY_PREFIX': 'throttle',
+    }
+
+# Cache respons dashboard & laporan (detik). Entry lama otomatis tidak dipakai
+# begitu ada data inventory yang berubah.
+INVENTORY_CACHE_ALIAS = 'default'
+INVENTORY_CACHE_TIMEOUT = 300
+
+# Broker event live (/api/events/). LocalBroker hanya menyebar event di dalam
+# satu proses: jalankan server sebagai satu proses ASGI (lihat Procfile), atau ganti
+# dengan broker lintas proses yang punya method publish / subscribe / unsubscribe.
+INVENTORY_EVENT_BROKER = 'inventory.events.LocalBroker'
+
+# Query dashboard & laporan dijalankan paralel, masing-masing dengan koneksi sendiri
+# (dibuka & ditutup per query, lihat inventory/parallel.py). Opt-in lewat env
+# INVENTORY_PARALLEL_QUERIES=1, hanya untuk PostgreSQL (SQLite tetap satu per satu) dan
+# sebaiknya di belakang pooler: satu request dashboard bisa memakai ±10 koneksi.
+INVENTORY_PARALLEL_QUERIES = bool(database_url) and os.environ.get('INVENTORY_PARALLEL_QUERIES', '').lower() in ('1', 'true', 'yes')
+
+# Berapa lama (detik) status user (aktif / role / versi token) di-cache per proses
+# oleh StatelessJWTAuthentication sebelum dicek ulang ke database.
+AUTH_USER_STATE_TTL = 30
+# Jumlah maksimum user di cache tsb (LRU): memori per proses tetap terbatas.
+AUTH_USER_STATE_CACHE_SIZE = 10000
+
+# --- Login ---
+# Biaya hash password (iterasi PBKDF2). Kosong = bawaan Django.
+# Hash lama tetap valid & di-hash ulang otomatis saat login berikutnya.
+PASSWORD_HASHERS = [
+    'users.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None
+
+# Token bucket percobaan login: (kapasitas burst, detik per token baru)
+LOGIN_THROTTLE_CACHE = 'throttle'
+LOGIN_THROTTLE_RATES = {
+    'ip': (20, 3),
+    'username': (5, 30),
+}
+# Maksimal hash password yang berjalan bersamaan per proses & lama antre (detik) sebelum 429
+LOGIN_MAX_CONCURRENT = 2
+LOGIN_QUEUE_TIMEOUT = 2
 
 
 # --- PASSWORD VALIDATION ---
@@ -118,12 +198,27 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Foto profil diproses saat upload (users/images.py): batas ukuran file & resolusi,
+# sisi terpanjang gambar utama (px) dan format hasil ('WEBP' atau 'JPEG').
+PROFILE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+PROFILE_IMAGE_MAX_PIXELS = 50_000_000
+PROFILE_IMAGE_MAX_SIZE = 1024
+PROFILE_IMAGE_FORMAT = 'WEBP'
+# File foto lama yang ditulis/dipakai ulang kurang dari N detik lalu tidak langsung
+# dihapus saat diganti (upload identik lain mungkin belum commit); cleanup_media yang menghapus.
+PROFILE_IMAGE_REUSE_GRACE = 300
+
 
 # --- REST FRAMEWORK ---
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        # JWTAuthentication + cek token_version: token yang sudah dicabut ditolak
+        'users.authentication.VersionedJWTAuthentication',
+    ),
+    # Jumlah reverse proxy di depan aplikasi: IP klien untuk throttle diambil dari entri
+    # X-Forwarded-For yang ditambahkan proxy tsb, bukan dari header kiriman klien.
+    # 0 = pakai REMOTE_ADDR (tanpa proxy). Railway punya satu proxy di depan.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1 if os.environ.get('RAILWAY_ENVIRONMENT') else 0)),
 }
 
 
@@ -161,4 +256,7 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+
+    # Refresh token dengan token_version lama (password/role diganti, akun nonaktif) ditolak
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.VersionedTokenRefreshSerializer',
 }
\ No newline at end of file
@@ -15,10 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from users.storage import HASHED_NAME_PATTERN
+from users.views import serve_immutable_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')), 
@@ -26,4 +29,11 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # File bernama hash isi (foto profil) dilayani dengan cache permanen; media lain seperti biasa
+    urlpatterns += [
+        re_path(
+            rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>(?:[\w-]+/)*{HASHED_NAME_PATTERN})$',
+            serve_immutable_media,
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,7 +1,11 @@
 from django.contrib import admin
-from .models import Category, Product, TransactionIn, TransactionOut
+from .models import Category, ChangeLog, Product, TransactionIn, TransactionOut, DailyProductMovement, StockAlert, StockMovement
 
 admin.site.register(Category)
 admin.site.register(Product)
 admin.site.register(TransactionIn)
-admin.site.register(TransactionOut)
\ No newline at end of file
+admin.site.register(TransactionOut)
+admin.site.register(DailyProductMovement)
+admin.site.register(StockMovement)
+admin.site.register(StockAlert)
+admin.site.register(ChangeLog)
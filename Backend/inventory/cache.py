@@ -0,0 +1,122 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+# --- Cache Respons Dashboard & Laporan ---
+# Semua entry cache memakai "generation" inventory di dalam key-nya.
+# Setiap kali Category/Product/Transaksi ditulis, generation dinaikkan
+# sehingga entry lama otomatis tidak terbaca lagi (tidak pernah basi).
+# Yang menaikkan generation: save()/delete() model inventory, bulk_record transaksi,
+# import CSV, `reconcile_stock --fix` dan `rebuild_daily_movements`.
+# Yang TIDAK (cache & ETag bisa basi sampai INVENTORY_CACHE_TIMEOUT / ganti hari):
+#   - QuerySet.update()/bulk_create()/delete() langsung di luar jalur di atas,
+#   - loaddata, migrasi data, SQL manual / edit lewat klien database.
+# Setelah perubahan seperti itu panggil bump_generation() (atau kosongkan cache).
+GENERATION_KEY = 'inventory:generation'
+
+# Counter hit/miss per proses (dilihat lewat /api/cache-stats/)
+stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[getattr(settings, 'INVENTORY_CACHE_ALIAS', 'default')]
+
+
+def current_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Key hilang (restart/eviction): mulai dari waktu sekarang (ms) supaya
+        # selalu lebih besar dari generation mana pun yang pernah dipakai
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    # Dinaikkan SETELAH commit: pembaca tidak bisa menyimpan data lama di generation baru
+    def bump():
+        cache = get_cache()
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            current_generation()
+    transaction.on_commit(bump)
+
+
+def build_key(endpoint, params):
+    # Tanggal hari ini ikut di key: widget "bulan ini" / "7 hari terakhir" berubah tiap hari
+    query = '&'.join(f"{name}={value}" for name, value in sorted(params.items()))
+    return f"inventory:response:{endpoint}:{current_generation()}:{timezone.now().date()}:{query}"
+
+
+def cached_response(*param_names):
+    # Decorator untuk method get() di APIView, contoh: @cached_response('period')
+    # param_names = query param yang membedakan isi respons.
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            params = {name: request.query_params.get(name, '') for name in param_names}
+            key = build_key(type(self).__name__, params)
+            cache = get_cache()
+
+            data = cache.get(key)
+            if data is not None:
+                stats['hits'] += 1
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            stats['misses'] += 1
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, getattr(settings, 'INVENTORY_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+
+# --- ETag / Conditional GET ---
+# ETag = hash(endpoint + generation + tanggal + URL lengkap). Tidak butuh query database:
+# kalau client mengirim If-None-Match yang sama, langsung balas 304 tanpa body
+# (tanpa query data & tanpa serialisasi). Karena itu ETag hanya sebenar generation-nya:
+# penulisan yang tidak memanggil bump_generation() (lihat daftar di atas) membuat client
+# terus menerima 304 untuk data lama sampai ganti hari (tidak ikut INVENTORY_CACHE_TIMEOUT).
+def make_etag(request, endpoint):
+    raw = f"{endpoint}:{current_generation()}:{timezone.now().date()}:{request.get_full_path()}"
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_response(view_method):
+    # Decorator untuk get()/list()/retrieve()
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = make_etag(request, type(self).__name__)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=304, headers=headers)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    # Untuk ViewSet: list & detail ikut pakai ETag
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
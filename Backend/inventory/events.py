@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# --- Event Inventory (Push via SSE) ---
+# Jalur tulis (transaksi, edit produk, import, alert stok) memanggil publish().
+# Event baru dikirim ke broker SETELAH commit, lalu broker meneruskannya ke semua
+# koneksi /api/events/ yang terbuka. Isi event sengaja ringkas (id yang berubah);
+# detail datanya diambil client lewat /api/changes/.
+#
+# Broker bisa diganti lewat settings.INVENTORY_EVENT_BROKER (dotted path ke class
+# dengan method publish / subscribe / unsubscribe), mis. untuk pub/sub lintas proses.
+
+
+class LocalBroker:
+    # Fan-out dalam SATU proses. Setiap koneksi = satu asyncio.Queue di event loop-nya,
+    # jadi ribuan koneksi idle hanya berupa coroutine yang menunggu, bukan thread.
+    QUEUE_SIZE = 100     # event tertahan per koneksi (client lambat -> event tertua dibuang)
+    HISTORY_SIZE = 500   # event terakhir untuk replay saat reconnect (Last-Event-ID)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # queue -> event loop pemiliknya
+        self.history = deque(maxlen=self.HISTORY_SIZE)
+        self._ids = itertools.count(1)
+
+    def publish(self, event_type, data):
+        # Aman dipanggil dari thread mana pun (view sync, on_commit, management command)
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data}
+            self.history.append(event)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Event loop koneksi sudah ditutup
+                self.unsubscribe(queue)
+        return event
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def subscribe(self, last_event_id=None):
+        # Harus dipanggil dari dalam event loop (view async)
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self.history:
+                    if event['id'] > last_event_id:
+                        self._deliver(queue, event)
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'INVENTORY_EVENT_BROKER', 'inventory.events.LocalBroker'))()
+    return _broker
+
+
+def publish(event_type, data):
+    # Dikirim setelah commit: client tidak pernah menerima event untuk data yang di-rollback
+    transaction.on_commit(lambda: get_broker().publish(event_type, data))
+
+
+def format_sse(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
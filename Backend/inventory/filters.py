@@ -0,0 +1,33 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+# --- Filter Query Param Inventory ---
+# View cukup mendefinisikan `filter_params`, contoh:
+#   filter_params = {'start': ('date__gte', 'date'), 'product': ('product_id', 'int')}
+# Lalu ?start=2026-01-01&product=3 otomatis jadi .filter(date__gte=..., product_id=3)
+class InventoryFilterBackend(BaseFilterBackend):
+    def parse_value(self, param, value, kind):
+        if kind == 'date':
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValidationError({param: "Format tanggal harus YYYY-MM-DD."})
+            return parsed
+        if kind == 'int':
+            try:
+                return int(value)
+            except ValueError:
+                raise ValidationError({param: "Harus berupa angka."})
+        return value
+
+    def filter_queryset(self, request, queryset, view):
+        lookups = {}
+        for param, (lookup, kind) in getattr(view, 'filter_params', {}).items():
+            value = request.query_params.get(param)
+            if value:
+                lookups[lookup] = self.parse_value(param, value, kind)
+        return queryset.filter(**lookups) if lookups else queryset
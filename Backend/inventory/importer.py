@@ -0,0 +1,211 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from . import events
+from .cache import bump_generation
+from .models import Category, ChangeLog, DailyProductMovement, Product, StockMovement
+
+
+# --- Import Produk dari CSV ---
+# Format kolom (baris pertama = header):
+#   kategori, nama, warna, harga_per_kg, berat
+# Produk dikenali dari (kategori, nama, warna). Kalau sudah ada -> harga & berat di-update,
+# kalau belum -> dibuat dengan berat sebagai stok awal.
+# File dibaca baris per baris dan ditulis per chunk (bulk_create/bulk_update),
+# jadi memori tidak ikut membesar walaupun file berisi 100 ribu baris.
+class InventoryImporter:
+    COLUMNS = ['kategori', 'nama', 'warna', 'harga_per_kg', 'berat']
+    MAX_REPORTED_ERRORS = 100
+
+    def __init__(self, dry_run=False, chunk_size=1000):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.category_ids = {}  # nama kategori -> id
+        # Entry change feed & produk yang berubah, ditulis sekali di akhir import (finish)
+        self.changes = []
+        self.product_ids = []
+        self.result = {
+            'dry_run': dry_run,
+            'created': 0,
+            'updated': 0,
+            'categories_created': 0,
+            'error_count': 0,
+            'errors': [],
+        }
+
+    def add_error(self, line, errors):
+        self.result['error_count'] += 1
+        if len(self.result['errors']) < self.MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'line': line, 'errors': errors})
+
+    # Validator batas digit sama dengan field model (dibuat sekali, bukan per baris)
+    DECIMAL_VALIDATORS = {
+        'price_per_kg': DecimalValidator(15, 0),
+        'weight': DecimalValidator(10, 2),
+    }
+
+    def clean_decimal(self, field_name, value, errors, column):
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            errors[column] = ["Harus berupa angka."]
+            return None
+        if not number.is_finite():
+            errors[column] = ["Harus berupa angka."]
+            return None
+        try:
+            self.DECIMAL_VALIDATORS[field_name](number)
+        except ValidationError as exc:
+            errors[column] = exc.messages
+            return None
+        return number
+
+    def parse_row(self, line, row):
+        # Validasi 1 baris; return dict siap simpan atau None kalau ada error
+        errors = {}
+        category = (row.get('kategori') or '').strip()
+        name = (row.get('nama') or '').strip()
+        color = (row.get('warna') or '').strip() or None
+        if not category:
+            errors['kategori'] = ["Wajib diisi."]
+        if not name:
+            errors['nama'] = ["Wajib diisi."]
+        elif len(name) > 100:
+            errors['nama'] = ["Maksimal 100 karakter."]
+        if len(category) > 100:
+            errors['kategori'] = ["Maksimal 100 karakter."]
+        if color and len(color) > 50:
+            errors['warna'] = ["Maksimal 50 karakter."]
+        price = self.clean_decimal('price_per_kg', (row.get('harga_per_kg') or '').strip(), errors, 'harga_per_kg')
+        weight = (row.get('berat') or '').strip()
+        weight = self.clean_decimal('weight', weight, errors, 'berat') if weight else None
+
+        if errors:
+            self.add_error(line, errors)
+            return None
+        return {'category': category, 'name': name, 'color': color, 'price_per_kg': price, 'weight': weight}
+
+    def resolve_categories(self, names):
+        # Kategori baru dibuat sekaligus; id disimpan di map nama -> id
+        missing = [name for name in names if name not in self.category_ids]
+        if not missing:
+            return
+        for category_id, name in Category.objects.filter(name__in=missing).values_list('id', 'name'):
+            self.category_ids.setdefault(name, category_id)
+        new_names = [name for name in missing if name not in self.category_ids]
+        if new_names:
+            created = Category.objects.bulk_create([Category(name=name) for name in new_names])
+            for category in created:
+                self.category_ids[category.name] = category.id
+            self.changes += [(Category, category.id, False) for category in created]
+            self.result['categories_created'] += len(new_names)
+
+    def write_chunk(self, rows):
+        self.resolve_categories({row['category'] for row in rows})
+
+        # Baris terakhir menang kalau produk yang sama muncul dua kali
+        by_key = {}
+        for row in rows:
+            by_key[(self.category_ids[row['category']], row['name'], row['color'])] = row
+
+        # Berat di CSV = stok absolut, selisihnya dihitung dari berat saat ini.
+        # Baris produk dikunci (SELECT ... FOR UPDATE, urut id supaya tidak deadlock) sampai
+        # import selesai, jadi transaksi masuk/keluar yang bersamaan tidak hilang tertimpa upsert.
+        existing = {
+            (product.category_id, product.name, product.color or None): product
+            for product in Product.objects.select_for_update().filter(
+                category_id__in={key[0] for key in by_key},
+                name__in={key[1] for key in by_key}
+            ).order_by('id')
+        }
+
+        to_create, to_update, adjustments = [], [], []
+        today = timezone.now().date()
+        for key, row in by_key.items():
+            product = existing.get(key)
+            if product is None:
+                to_create.append(Product(
+                    category_id=key[0], name=row['name'], color=row['color'],
+                    price_per_kg=row['price_per_kg'], weight=row['weight'] or 0
+                ))
+            else:
+                product.price_per_kg = row['price_per_kg']
+                if row['weight'] is not None:
+                    # Selisih berat dicatat di ledger sebagai penyesuaian
+                    adjustments.append((product.id, today, row['weight'] - product.weight,
+                                        StockMovement.SOURCE_ADJUSTMENT, None))
+                    product.weight = row['weight']
+                to_update.append(product)
+
+        Product.objects.bulk_create(to_create)
+        StockMovement.objects.record(
+            [(product.id, today, product.weight, StockMovement.SOURCE_OPENING, None) for product in to_create]
+            + adjustments
+        )
+        if to_update:
+            # Upsert berdasarkan id (INSERT ... ON CONFLICT DO UPDATE), jauh lebih cepat
+            # daripada bulk_update yang membuat CASE WHEN raksasa
+            Product.objects.bulk_create(
+                to_update, update_conflicts=True, unique_fields=['id'],
+                update_fields=['price_per_kg', 'weight', 'updated_at']
+            )
+            # Harga bisa berubah -> nilai rekap harian produk ini dihitung ulang
+            price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price_per_kg')[:1])
+            DailyProductMovement.objects.filter(product_id__in=[p.id for p in to_update]).update(
+                value_in=F('qty_in') * price,
+                value_out=F('qty_out') * price
+            )
+        self.product_ids += [p.id for p in to_create + to_update]
+        self.result['created'] += len(to_create)
+        self.result['updated'] += len(to_update)
+
+    def finish(self):
+        # Status stok menipis & change feed: di AKHIR transaksi, karena insert feed memegang
+        # lock_feeds sampai commit (lihat models.py). Di awal = semua transaksi masuk/keluar
+        # ikut menunggu seluruh import selesai.
+        product_ids = list(dict.fromkeys(self.product_ids))  # produk bisa muncul di beberapa chunk
+        for start in range(0, len(product_ids), self.chunk_size):
+            Product.objects.filter(pk__in=product_ids[start:start + self.chunk_size]).refresh_low_stock()
+        ChangeLog.objects.record(self.changes + [(Product, product_id, False) for product_id in product_ids])
+
+    def run(self, stream):
+        # stream: file biner (upload / open(path, 'rb'))
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text)
+        missing_columns = [column for column in self.COLUMNS if column not in (reader.fieldnames or [])]
+        if missing_columns:
+            self.add_error(1, {'header': [f"Kolom wajib tidak ada: {', '.join(missing_columns)}"]})
+            return self.result
+
+        # Semua atau tidak sama sekali: kalau ada error (atau dry run), semua perubahan dibatalkan
+        # Begitu ada satu error, hasil akhirnya pasti rollback: sisa file cukup divalidasi
+        # (supaya semua error tetap dilaporkan), tidak perlu ditulis lagi.
+        with transaction.atomic():
+            chunk = []
+            for row in reader:
+                parsed = self.parse_row(reader.line_num, row)
+                if self.result['error_count']:
+                    chunk = []
+                    continue
+                chunk.append(parsed)
+                if len(chunk) >= self.chunk_size:
+                    self.write_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.write_chunk(chunk)
+
+            if self.dry_run or self.result['error_count']:
+                transaction.set_rollback(True)
+            else:
+                self.finish()
+                # Bisa ribuan produk sekaligus: products=None artinya "muat ulang semua"
+                events.publish('stock', {'products': None})
+                bump_generation()
+        return self.result
@@ -0,0 +1,51 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from inventory.views import DashboardDataView, ReportView
+
+ENDPOINTS = (
+    ('dashboard', DashboardDataView, {}),
+    ('laporan mingguan', ReportView, {'period': 'mingguan'}),
+    ('laporan bulanan', ReportView, {'period': 'bulanan'}),
+    ('laporan tahunan', ReportView, {'period': 'tahunan'}),
+)
+
+
+class Command(BaseCommand):
+    help = "Bandingkan waktu respons dashboard & laporan: query berurutan vs paralel (INVENTORY_PARALLEL_QUERIES)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Jumlah request per endpoint per mode.")
+
+    def measure(self, view, params, user, iterations):
+        factory = APIRequestFactory()
+        samples = []
+        # Request pertama = pemanasan (koneksi & thread pool), tidak dihitung
+        for attempt in range(iterations + 1):
+            request = factory.get('/', params)
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            view(request)
+            if attempt:
+                samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def handle(self, *args, **options):
+        # User tidak disimpan: cukup untuk lolos IsAuthenticated
+        user = get_user_model()(username='benchmark')
+        self.stdout.write(f"{'endpoint':<20}{'berurutan':>12}{'paralel':>12}{'speedup':>10}")
+        for label, view_class, params in ENDPOINTS:
+            view = view_class.as_view()
+            timings = {}
+            for parallel in (False, True):
+                # Cache respons dimatikan supaya yang diukur benar-benar query-nya
+                with override_settings(INVENTORY_PARALLEL_QUERIES=parallel, INVENTORY_CACHE_TIMEOUT=0):
+                    timings[parallel] = self.measure(view, params, user, options['iterations'])
+            self.stdout.write(
+                f"{label:<20}{timings[False]:>10.1f}ms{timings[True]:>10.1f}ms{timings[False] / timings[True]:>9.2f}x"
+            )
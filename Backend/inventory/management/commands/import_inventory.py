@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importer import InventoryImporter
+
+
+class Command(BaseCommand):
+    help = "Import kategori, produk, harga & stok awal dari file CSV (kategori,nama,warna,harga_per_kg,berat)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Lokasi file CSV")
+        parser.add_argument('--dry-run', action='store_true', help="Cek file tanpa menyimpan apa pun.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        importer = InventoryImporter(dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        with open(options['path'], 'rb') as stream:
+            result = importer.run(stream)
+
+        for error in result['errors']:
+            self.stdout.write(f"Baris {error['line']}: {error['errors']}")
+        if result['error_count']:
+            raise CommandError(f"{result['error_count']} baris bermasalah, tidak ada data yang disimpan.")
+
+        prefix = "[DRY RUN] " if result['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['created']} produk baru, {result['updated']} produk di-update, "
+            f"{result['categories_created']} kategori baru."
+        ))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.cache import bump_generation
+from inventory.models import DailyProductMovement, Product, TransactionIn, TransactionOut
+
+FIELDS = ('qty_in', 'qty_out', 'value_in', 'value_out')
+
+
+def ledger_movements():
+    # Hitung ulang rekap langsung dari tabel transaksi mentah:
+    # {(tanggal, product_id): {'qty_in', 'qty_out', 'value_in', 'value_out'}}
+    rows = {}
+    for model, field in ((TransactionIn, 'qty_in'), (TransactionOut, 'qty_out')):
+        grouped = model.objects.values('date', 'product_id').annotate(total=Sum('quantity')).order_by()
+        for item in grouped:
+            row = rows.setdefault((item['date'], item['product_id']), dict.fromkeys(FIELDS, 0))
+            row[field] = item['total']
+
+    prices = dict(Product.objects.values_list('id', 'price_per_kg'))
+    for (day, product_id), row in rows.items():
+        row['value_in'] = row['qty_in'] * prices[product_id]
+        row['value_out'] = row['qty_out'] * prices[product_id]
+    return rows
+
+
+def stored_movements():
+    # Baris rekap yang isinya nol semua (sisa transaksi yang dihapus) diabaikan
+    return {
+        (row['date'], row['product_id']): {field: row[field] for field in FIELDS}
+        for row in DailyProductMovement.objects.values('date', 'product_id', *FIELDS)
+        if any(row[field] for field in FIELDS)
+    }
+
+
+class Command(BaseCommand):
+    help = "Bangun ulang tabel rekap harian (DailyProductMovement) dari transaksi & cocokkan hasilnya."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Hanya cocokkan rekap dengan transaksi, tanpa membangun ulang."
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                DailyProductMovement.objects.all().delete()
+                DailyProductMovement.objects.bulk_create([
+                    DailyProductMovement(date=day, product_id=product_id, **row)
+                    for (day, product_id), row in ledger_movements().items()
+                ], batch_size=1000)
+                # Laporan dibaca dari rekap ini: cache & ETag lama tidak berlaku lagi
+                bump_generation()
+            self.stdout.write("Rekap harian dibangun ulang.")
+
+        expected = ledger_movements()
+        stored = stored_movements()
+        mismatches = [key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)]
+        for day, product_id in sorted(mismatches)[:20]:
+            self.stdout.write(
+                f"Selisih {day} produk {product_id}: rekap={stored.get((day, product_id))} "
+                f"transaksi={expected.get((day, product_id))}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} baris rekap tidak cocok dengan transaksi.")
+        self.stdout.write(self.style.SUCCESS(f"OK: {len(expected)} baris rekap cocok dengan transaksi."))
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from inventory import events
+from inventory.cache import bump_generation
+from inventory.models import ChangeLog, Product, StockCheckpoint, StockMovement
+
+
+class Command(BaseCommand):
+    help = "Cocokkan Product.weight dengan ledger StockMovement, perbaiki selisih & perbarui checkpoint saldo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Samakan Product.weight dengan saldo ledger.")
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Hitung saldo dari seluruh histori (abaikan checkpoint) untuk memeriksa checkpoint juga."
+        )
+
+    def ledger_balances(self, full):
+        if full:
+            return {
+                item['product_id']: item['total']
+                for item in StockMovement.objects.values('product_id').annotate(total=Sum('quantity')).order_by()
+            }
+        return StockMovement.objects.balances()
+
+    def lock_ledger(self):
+        # PostgreSQL: SHARE = tunggu semua transaksi yang sedang INSERT movement sampai commit,
+        # dan tahan INSERT baru sampai perintah ini selesai. Sesudahnya tidak ada movement
+        # "di tengah jalan": semua id <= last_movement sudah ter-commit dan terlihat, jadi
+        # checkpoint tidak melewatkan movement yang commit belakangan dengan id lebih kecil.
+        # SQLite: penulis sudah berurutan, tidak perlu.
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {StockMovement._meta.db_table} IN SHARE MODE')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Urutan kunci sama dengan jalur tulis (baris produk dulu, baru ledger),
+            # supaya tidak deadlock dengan transaksi yang sedang berjalan
+            weights = dict(Product.objects.select_for_update().values_list('id', 'weight'))
+            self.lock_ledger()
+            last_movement = StockMovement.objects.aggregate(last=Max('id'))['last'] or 0
+            balances = self.ledger_balances(options['full'])
+
+            drift = {
+                product_id: (weight, balances.get(product_id, 0))
+                for product_id, weight in weights.items()
+                if weight != balances.get(product_id, 0)
+            }
+            for product_id, (weight, balance) in sorted(drift.items())[:20]:
+                self.stdout.write(f"Selisih produk {product_id}: weight={weight} ledger={balance}")
+
+            if drift and options['fix']:
+                # Ledger adalah sumber kebenaran: snapshot di Product yang disesuaikan.
+                # Tidak ada StockMovement baru (ledger-nya sudah benar), tapi efek samping
+                # jalur tulis lain tetap dijalankan: status stok menipis, change feed,
+                # event SSE & generation cache (ETag/cache laporan).
+                now = timezone.now()
+                for product_id, (weight, balance) in drift.items():
+                    Product.objects.filter(pk=product_id).update(weight=balance, updated_at=now)
+                Product.objects.filter(pk__in=list(drift)).refresh_low_stock()
+                ChangeLog.objects.record([(Product, product_id, False) for product_id in sorted(drift)])
+                events.publish('stock', {'products': sorted(drift)})
+                bump_generation()
+                self.stdout.write(f"{len(drift)} produk diperbaiki dari ledger.")
+
+            # Checkpoint baru: saldo s/d movement terakhir, supaya pembacaan saldo
+            # berikutnya cukup menjumlahkan movement sesudahnya
+            StockCheckpoint.objects.bulk_create([
+                StockCheckpoint(product_id=product_id, movement_id=last_movement, balance=balances.get(product_id, 0))
+                for product_id in weights
+            ], update_conflicts=True, unique_fields=['product'], update_fields=['movement_id', 'balance', 'created_at'])
+
+        if drift and not options['fix']:
+            raise CommandError(f"{len(drift)} produk tidak cocok dengan ledger. Jalankan dengan --fix untuk memperbaiki.")
+        self.stdout.write(self.style.SUCCESS(f"OK: {len(weights)} produk cocok dengan ledger."))
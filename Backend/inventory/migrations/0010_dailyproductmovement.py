@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-18 14:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_daily_movements(apps, schema_editor):
+    # Isi rekap harian dari transaksi yang sudah ada
+    Product = apps.get_model('inventory', 'Product')
+    TransactionIn = apps.get_model('inventory', 'TransactionIn')
+    TransactionOut = apps.get_model('inventory', 'TransactionOut')
+    DailyProductMovement = apps.get_model('inventory', 'DailyProductMovement')
+
+    rows = {}
+    for model, field in ((TransactionIn, 'qty_in'), (TransactionOut, 'qty_out')):
+        grouped = model.objects.values('date', 'product_id').annotate(total=Sum('quantity')).order_by()
+        for item in grouped:
+            rows.setdefault((item['date'], item['product_id']), {'qty_in': 0, 'qty_out': 0})[field] = item['total']
+
+    prices = dict(Product.objects.values_list('id', 'price_per_kg'))
+    DailyProductMovement.objects.bulk_create([
+        DailyProductMovement(
+            date=day, product_id=product_id,
+            qty_in=qty['qty_in'], qty_out=qty['qty_out'],
+            value_in=qty['qty_in'] * prices[product_id],
+            value_out=qty['qty_out'] * prices[product_id],
+        )
+        for (day, product_id), qty in rows.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_alter_product_price_per_kg_alter_product_weight_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('qty_in', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('qty_out', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('value_in', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('value_out', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='inventory.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='unique_daily_movement_per_product')],
+            },
+        ),
+        migrations.RunPython(fill_daily_movements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_stock_ledger(apps, schema_editor):
+    # Bangun ledger dari data yang sudah ada:
+    # 1 baris stok awal per produk (selisih berat sekarang dengan total transaksi),
+    # lalu 1 baris per transaksi masuk/keluar.
+    Product = apps.get_model('inventory', 'Product')
+    TransactionIn = apps.get_model('inventory', 'TransactionIn')
+    TransactionOut = apps.get_model('inventory', 'TransactionOut')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+
+    net = {}
+    for model, sign in ((TransactionIn, 1), (TransactionOut, -1)):
+        for item in model.objects.values('product_id').annotate(total=Sum('quantity')).order_by():
+            net[item['product_id']] = net.get(item['product_id'], 0) + sign * item['total']
+
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product.id, date=product.created_at.date(),
+                      quantity=product.weight - net.get(product.id, 0), source_type='opening')
+        for product in Product.objects.only('id', 'weight', 'created_at').iterator()
+        if product.weight - net.get(product.id, 0)
+    ], batch_size=1000)
+
+    for model, sign, source_type in ((TransactionIn, 1, 'in'), (TransactionOut, -1, 'out')):
+        batch = []
+        for trans in model.objects.order_by('created_at', 'id').iterator(chunk_size=2000):
+            batch.append(StockMovement(product_id=trans.product_id, date=trans.date,
+                                       quantity=sign * trans.quantity, source_type=source_type, source_id=trans.id))
+            if len(batch) >= 2000:
+                StockMovement.objects.bulk_create(batch)
+                batch = []
+        StockMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_product_category_name_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField(help_text='Movement terakhir yang sudah termasuk di saldo')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoint', to='inventory.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Bertanda: + masuk, - keluar', max_digits=12)),
+                ('source_type', models.CharField(choices=[('in', 'Barang Masuk'), ('out', 'Barang Keluar'), ('opening', 'Stok Awal'), ('adjustment', 'Penyesuaian')], max_length=20)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'id'], name='stockmovement_product_id_idx')],
+            },
+        ),
+        migrations.RunPython(fill_stock_ledger, migrations.RunPython.noop),
+    ]
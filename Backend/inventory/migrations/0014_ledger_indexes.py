@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_stockmovement_product_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['weight'], name='product_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at'], name='product_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionin',
+            index=models.Index(fields=['date', 'created_at'], name='trans_in_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionin',
+            index=models.Index(fields=['product', 'date'], name='trans_in_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionout',
+            index=models.Index(fields=['date', 'created_at'], name='trans_out_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionout',
+            index=models.Index(fields=['product', 'date'], name='trans_out_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+def fill_change_log(apps, schema_editor):
+    # Data yang sudah ada dicatat sebagai "berubah", supaya ?since=0 memberi salinan penuh
+    ChangeLog = apps.get_model('inventory', 'ChangeLog')
+    for model_name in ('category', 'product', 'transactionin', 'transactionout'):
+        model = apps.get_model('inventory', model_name)
+        batch = []
+        for pk in model.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=2000):
+            batch.append(ChangeLog(model=model_name, object_id=pk))
+            if len(batch) >= 2000:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_low_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(fill_change_log, migrations.RunPython.noop),
+    ]
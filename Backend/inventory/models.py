@@ -1,12 +1,100 @@
-from django.db import models, transaction
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from . import events
+from .cache import bump_generation
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
+    # Batas stok menipis default untuk semua produk di kategori ini (Kg)
+    min_weight = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if not adding:
+                # Batas kategori bisa berubah -> status stok menipis produknya dicek ulang
+                Product.objects.filter(category=self).refresh_low_stock()
+            ChangeLog.objects.record([(Category, self.pk, False)])
+        bump_generation()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # Produk & transaksinya ikut terhapus (CASCADE) -> catat tombstone-nya juga
+            products = Product.objects.filter(category=self)
+            tombstones = [(Category, self.pk, True)] + Product.cascade_tombstones(products)
+            result = super().delete(*args, **kwargs)
+            ChangeLog.objects.record(tombstones)
+        bump_generation()
+        return result
+
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def adjust_weight(self, product_id, delta):
+        # Ubah berat langsung di database dalam SATU query:
+        # UPDATE product SET weight = weight + delta WHERE id = ...
+        # Tidak ada baca-ubah-simpan di Python, jadi update paralel tidak saling menimpa.
+        if not delta:
+            return 0
+        return self.filter(pk=product_id).update(
+            weight=F('weight') + delta,
+            updated_at=timezone.now()
+        )
+
+    def stock_at(self, day):
+        # Posisi stok pada akhir tanggal `day`:
+        # berat sekarang - jumlah movement SESUDAH tanggal itu.
+        # Yang dijumlahkan hanya movement setelah `day` (pakai index (product, date)),
+        # jadi tidak tergantung panjang seluruh histori.
+        after = StockMovement.objects.filter(product=OuterRef('pk'), date__gt=day)\
+            .values('product').annotate(total=Sum('quantity')).values('total')
+        # Produk "sudah ada" pada `day` kalau dibuat sebelum hari berikutnya dimulai
+        # (perbandingan langsung ke kolom, bukan created_at::date) ATAU punya movement
+        # bertanggal <= day (produk baru dengan transaksi yang di-backdate).
+        next_day = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        moved = StockMovement.objects.filter(product=OuterRef('pk'), date__lte=day)
+        return self.filter(Q(created_at__lt=next_day) | Exists(moved)).annotate(
+            weight_as_of=F('weight') - Coalesce(Subquery(after), Value(0), output_field=models.DecimalField())
+        )
+
+    def refresh_low_stock(self):
+        # Cek ulang status stok menipis produk di queryset ini (dipanggil di jalur tulis:
+        # transaksi, edit produk/kategori, import). Hanya produk yang statusnya BERUBAH
+        # yang di-update & dicatat sebagai StockAlert, jadi endpoint low-stock cukup
+        # membaca flag is_low_stock yang ter-index, tanpa menghitung ulang.
+        rows = self.annotate(threshold=Coalesce('min_weight', 'category__min_weight'))\
+            .values_list('id', 'weight', 'threshold', 'is_low_stock').order_by()
+        alerts = []
+        for product_id, weight, threshold, was_low in rows:
+            is_low = threshold is not None and weight < threshold
+            if is_low != was_low:
+                alerts.append(StockAlert(
+                    product_id=product_id, weight=weight, threshold=threshold,
+                    kind=StockAlert.KIND_LOW if is_low else StockAlert.KIND_RECOVERED
+                ))
+        for kind, flag in ((StockAlert.KIND_LOW, True), (StockAlert.KIND_RECOVERED, False)):
+            ids = [alert.product_id for alert in alerts if alert.kind == kind]
+            if ids:
+                Product.objects.filter(pk__in=ids).update(is_low_stock=flag)
+        if not alerts:
+            return []
+        lock_feeds()
+        ChangeLog.objects.record([(Product, alert.product_id, False) for alert in alerts])
+        alerts = StockAlert.objects.bulk_create(alerts)
+        events.publish('low_stock', {'alerts': [
+            {'id': alert.id, 'product': alert.product_id, 'kind': alert.kind,
+             'weight': alert.weight, 'threshold': alert.threshold}
+            for alert in alerts
+        ]})
+        return alerts
+
 class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     name = models.CharField(max_length=100)
@@ -15,93 +103,470 @@ class Product(models.Model):
     # KITA PAKAI WEIGHT SEKARANG (BUKAN STOCK)
     weight = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Total Berat (Kg)")
     price_per_kg = models.DecimalField(max_digits=15, decimal_places=0)
+
+    # Batas stok menipis (Kg). Kosong = ikut Category.min_weight
+    min_weight = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # Dijaga oleh refresh_low_stock() setiap kali berat / batas berubah
+    is_low_stock = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Lookup produk per (kategori, nama), dipakai import CSV
+            models.Index(fields=['category', 'name'], name='product_category_name_idx'),
+            # Stok terendah di dashboard & urutan default list produk
+            models.Index(fields=['weight'], name='product_weight_idx'),
+            models.Index(fields=['created_at'], name='product_created_at_idx'),
+            # Daftar stok menipis: WHERE is_low_stock ORDER BY weight
+            models.Index(fields=['is_low_stock', 'weight'], name='product_low_stock_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ingat berat saat dibaca: perubahan berat lewat save() dicatat sebagai selisihnya.
+        # Harga juga: rekap harian hanya dihitung ulang kalau harganya benar-benar berubah.
+        instance._loaded_weight = instance.__dict__.get('weight')
+        instance._loaded_price = instance.__dict__.get('price_per_kg')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_weight = self.__dict__.get('weight')
+        self._loaded_price = self.__dict__.get('price_per_kg')
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                # Berat awal produk baru = stok pembuka di ledger
+                StockMovement.objects.record([
+                    (self.pk, timezone.now().date(), self.weight, StockMovement.SOURCE_OPENING, None)
+                ])
+            else:
+                # Kolom weight TIDAK ditulis ulang dari memori (bisa basi & menimpa update
+                # transaksi yang berjalan bersamaan). Kalau berat memang diedit,
+                # hanya selisihnya yang diterapkan & dicatat sebagai penyesuaian.
+                loaded = getattr(self, '_loaded_weight', None)
+                if loaded is None:
+                    loaded = Product.objects.filter(pk=self.pk).values_list('weight', flat=True).first() or 0
+                delta = self.weight - loaded
+
+                update_fields = kwargs.pop('update_fields', None)
+                if update_fields is None:
+                    update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+                update_fields = [name for name in update_fields if name not in ('weight', 'is_low_stock')]
+                super().save(*args, update_fields=update_fields, **kwargs)
+
+                if delta:
+                    Product.objects.adjust_weight(self.pk, delta)
+                    StockMovement.objects.record([
+                        (self.pk, timezone.now().date(), delta, StockMovement.SOURCE_ADJUSTMENT, None)
+                    ])
+                    events.publish('stock', {'products': [self.pk]})
+                # Harga berubah -> nilai di rekap harian ikut dihitung ulang
+                # (harga awal tidak diketahui, mis. instance dibuat manual -> hitung ulang saja)
+                loaded_price = getattr(self, '_loaded_price', None)
+                if loaded_price is None or self.price_per_kg != loaded_price:
+                    DailyProductMovement.objects.recompute_values(self)
+            # Berat awal / berat / batas bisa berubah -> cek stok menipis
+            for alert in Product.objects.filter(pk=self.pk).refresh_low_stock():
+                self.is_low_stock = alert.kind == StockAlert.KIND_LOW
+            ChangeLog.objects.record([(Product, self.pk, False)])
+            self._loaded_weight = self.weight
+            self._loaded_price = self.price_per_kg
+        bump_generation()
+
+    @staticmethod
+    def cascade_tombstones(products):
+        # Tombstone untuk produk + semua transaksinya yang ikut terhapus (CASCADE)
+        tombstones = [(Product, pk, True) for pk in products.values_list('pk', flat=True)]
+        for model in (TransactionIn, TransactionOut):
+            tombstones += [(model, pk, True) for pk in model.objects.filter(product__in=products).values_list('pk', flat=True)]
+        return tombstones
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            tombstones = Product.cascade_tombstones(Product.objects.filter(pk=self.pk))
+            result = super().delete(*args, **kwargs)
+            ChangeLog.objects.record(tombstones)
+        bump_generation()
+        return result
+
     def __str__(self):
         return self.name
-    
-class TransactionIn(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transactions_in')
+
+# --- Alert Stok Menipis ---
+# Dicatat saat berat produk MELEWATI batas min_weight (turun di bawah batas = 'low',
+# naik lagi / batas dihapus = 'recovered'). Frontend cukup polling feed ini
+# dengan ?since=<id terakhir> (lihat StockAlertViewSet).
+class StockAlert(models.Model):
+    KIND_LOW = 'low'
+    KIND_RECOVERED = 'recovered'
+    KIND_CHOICES = (
+        (KIND_LOW, 'Stok Menipis'),
+        (KIND_RECOVERED, 'Stok Aman'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_alerts')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    weight = models.DecimalField(max_digits=10, decimal_places=2)
+    threshold = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product_id} - {self.kind} ({self.weight} Kg)"
+
+# --- Change Log (Sinkronisasi Inkremental) ---
+# Setiap create/update/delete Category, Product & transaksi lewat jalur model
+# (save/delete/bulk_record/import) menambah satu baris di sini. Client cukup memanggil
+# /api/changes/?since=<cursor> untuk mengambil yang berubah sejak sync terakhir.
+# Catatan: update massal lewat QuerySet.update()/delete() di luar jalur ini tidak tercatat.
+#
+# Urutan id = urutan commit: id dialokasikan saat INSERT, bukan saat commit. Tanpa kunci,
+# transaksi yang mendapat id 104 bisa commit SESUDAH client menerima cursor 105, dan
+# perubahan 104 tidak pernah terkirim. Karena itu INSERT ke feed (ChangeLog.record dan
+# StockAlert di refresh_low_stock) mengambil lock_feeds() dulu, dan kunci itu dipegang
+# sampai commit. Agar penulis lain tidak ikut antre selama seluruh transaksi:
+#   - insert feed selalu jadi langkah TERAKHIR transaksi (import: sekali di akhir),
+#   - sesudah lock_feeds() tidak ada lagi yang menunggu kunci baris lain
+#     (baris produk milik alert sudah dikunci transaksi itu sendiri sebelumnya),
+# jadi yang berjalan bergiliran hanya beberapa INSERT kecil menjelang commit.
+FEED_LOCK_KEY = 0x494e5646  # 'INVF'
+
+
+def lock_feeds():
+    # Hanya bermakna di dalam transaction.atomic (dilepas otomatis saat commit/rollback).
+    # PostgreSQL: advisory lock level transaksi (re-entrant). SQLite: penulis sudah
+    # berurutan (kunci tulis dipegang dari INSERT pertama sampai commit), jadi tidak perlu.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [FEED_LOCK_KEY])
+
+
+def insert_rows(model, fields, rows, batch_size=1000):
+    # INSERT multi-baris langsung dari tuple nilai: tanpa membuat instance model dan tanpa
+    # get_db_prep_save per kolom seperti bulk_create (import 100 ribu baris = ratusan ribu
+    # baris ledger/feed). Hanya untuk tabel append-only yang nilainya sudah bersih
+    # (ChangeLog, StockMovement); created_at diisi di sini karena auto_now_add dilewati.
+    if not rows:
+        return
+    opts = model._meta
+    quote = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in fields] + [opts.get_field('created_at')]
+    columns = ', '.join(quote(field.column) for field in fields)
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    batch_size = min(batch_size, connection.ops.bulk_batch_size(fields, rows))
+    placeholder = '(%s)' % ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {", ".join([placeholder] * len(batch))}',
+                [value for row in batch for value in (*row, created_at)]
+            )
+
+
+class ChangeLogQuerySet(models.QuerySet):
+    def record(self, entries):
+        # entries: list (model class, pk, deleted)
+        lock_feeds()
+        insert_rows(ChangeLog, ['model', 'object_id', 'deleted'], [
+            (model._meta.model_name, pk, deleted) for model, pk, deleted in entries
+        ])
+
+class ChangeLog(models.Model):
+    model = models.CharField(max_length=30)  # category / product / transactionin / transactionout
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    def __str__(self):
+        return f"#{self.id} {self.model}:{self.object_id}{' (hapus)' if self.deleted else ''}"
+
+# --- Ledger Stok (Append-Only) ---
+# Sumber kebenaran stok: setiap perubahan berat dicatat sebagai satu baris bertanda
+# (+ masuk, - keluar) dan TIDAK pernah diubah/dihapus. Product.weight hanyalah
+# snapshot yang di-update bersamaan; perintah `reconcile_stock` mencocokkan keduanya.
+class StockMovementQuerySet(models.QuerySet):
+    def record(self, entries):
+        # entries: list (product_id, tanggal, quantity bertanda, source_type, source_id)
+        insert_rows(StockMovement, ['product', 'date', 'quantity', 'source_type', 'source_id'], [
+            entry for entry in entries if entry[2]
+        ])
+
+    def balances(self, product_ids=None):
+        # Saldo per produk = checkpoint terakhir + jumlah movement sesudah checkpoint.
+        # Yang dijumlahkan hanya "ekor" kecil setelah checkpoint, bukan seluruh histori.
+        checkpoints = StockCheckpoint.objects.all()
+        if product_ids is not None:
+            checkpoints = checkpoints.filter(product_id__in=product_ids)
+        result = {cp.product_id: cp.balance for cp in checkpoints}
+
+        last_id = StockCheckpoint.objects.filter(product_id=OuterRef('product_id')).values('movement_id')[:1]
+        tail = self.annotate(checkpoint_id=Coalesce(Subquery(last_id), 0))\
+            .filter(id__gt=F('checkpoint_id'))
+        if product_ids is not None:
+            tail = tail.filter(product_id__in=product_ids)
+        for item in tail.values('product_id').annotate(total=Sum('quantity')).order_by():
+            result[item['product_id']] = result.get(item['product_id'], 0) + item['total']
+        return result
+
+class StockMovement(models.Model):
+    SOURCE_IN = 'in'
+    SOURCE_OUT = 'out'
+    SOURCE_OPENING = 'opening'
+    SOURCE_ADJUSTMENT = 'adjustment'
+    SOURCE_CHOICES = (
+        (SOURCE_IN, 'Barang Masuk'),
+        (SOURCE_OUT, 'Barang Keluar'),
+        (SOURCE_OPENING, 'Stok Awal'),
+        (SOURCE_ADJUSTMENT, 'Penyesuaian'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
     date = models.DateField()
-    quantity = models.DecimalField(max_digits=10, decimal_places=2)
-    notes = models.TextField(blank=True, null=True)
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, help_text="Bertanda: + masuk, - keluar")
+    source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.BigIntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StockMovementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Jumlah "ekor" setelah checkpoint per produk
+            models.Index(fields=['product', 'id'], name='stockmovement_product_id_idx'),
+            # Posisi stok per tanggal (Product.objects.stock_at)
+            models.Index(fields=['product', 'date'], name='stockmovement_product_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("StockMovement bersifat append-only, tidak boleh diubah.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("StockMovement bersifat append-only, tidak boleh dihapus.")
+
+    def __str__(self):
+        return f"{self.source_type} - {self.product_id} - {self.quantity} Kg"
+
+# Saldo stok per produk sampai movement tertentu (diperbarui berkala oleh `reconcile_stock`)
+class StockCheckpoint(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='stock_checkpoint')
+    movement_id = models.BigIntegerField(help_text="Movement terakhir yang sudah termasuk di saldo")
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id} s/d #{self.movement_id}: {self.balance} Kg"
+
+# Nilai satu transaksi = quantity * harga/kg produk (dihitung di database lewat JOIN)
+TRANSACTION_VALUE = F('quantity') * F('product__price_per_kg')
+
+class StockTransactionQuerySet(models.QuerySet):
+    def totals(self):
+        # Total berat & total nilai sekaligus dalam SATU query aggregate
+        result = self.aggregate(total_quantity=Sum('quantity'), total_value=Sum(TRANSACTION_VALUE))
+        return {
+            'quantity': result['total_quantity'] or 0,
+            'value': result['total_value'] or 0,
+        }
+
+# --- Rekap Harian per Produk ---
+# Ringkasan pergerakan barang per (tanggal, produk), di-update di transaksi database
+# yang sama dengan setiap tulis TransactionIn/TransactionOut. Laporan membaca tabel ini
+# (maksimal 1 baris per produk per hari) dan tidak perlu scan seluruh transaksi.
+# value_* selalu = qty_* x harga/kg produk saat ini (sama seperti perhitungan laporan).
+class DailyProductMovementQuerySet(models.QuerySet):
+    def _increment(self, day, product_id, qty_in, qty_out):
+        price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price_per_kg')[:1])
+        return self.filter(date=day, product_id=product_id).update(
+            qty_in=F('qty_in') + qty_in,
+            qty_out=F('qty_out') + qty_out,
+            value_in=(F('qty_in') + qty_in) * price,
+            value_out=(F('qty_out') + qty_out) * price
+        )
+
+    def apply_deltas(self, deltas):
+        # deltas: {(tanggal, product_id): [delta_qty_in, delta_qty_out]}
+        for (day, product_id), (qty_in, qty_out) in deltas.items():
+            if not qty_in and not qty_out:
+                continue
+            if not self._increment(day, product_id, qty_in, qty_out):
+                # Baris hari ini belum ada -> buat dulu (aman kalau ada yang membuat duluan)
+                try:
+                    with transaction.atomic():
+                        self.create(date=day, product_id=product_id)
+                except IntegrityError:
+                    pass
+                self._increment(day, product_id, qty_in, qty_out)
+
+    def recompute_values(self, product):
+        # Dipanggil saat harga produk berubah
+        return self.filter(product=product).update(
+            value_in=F('qty_in') * product.price_per_kg,
+            value_out=F('qty_out') * product.price_per_kg
+        )
+
+class DailyProductMovement(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_movements')
+    qty_in = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    qty_out = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    value_in = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    value_out = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    objects = DailyProductMovementQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_movement_per_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id} (+{self.qty_in} / -{self.qty_out})"
+
+# --- Base Transaksi Stok ---
+# Logika UNDO/APPLY dipakai bersama oleh TransactionIn & TransactionOut.
+# Subclass cukup menentukan STOCK_SIGN: +1 (menambah berat) atau -1 (mengurangi berat)
+# dan MOVEMENT_FIELD: kolom rekap harian yang diisi ('qty_in' / 'qty_out').
+class StockTransaction(models.Model):
+    STOCK_SIGN = 1
+    MOVEMENT_FIELD = 'qty_in'
+    SOURCE_TYPE = StockMovement.SOURCE_IN
+
+    class Meta:
+        abstract = True
+
+    def _locked_snapshot(self):
+        # Ambil versi transaksi yang tersimpan di database & kunci barisnya.
+        # Hanya di sini select_for_update dibutuhkan: dua edit/hapus bersamaan pada
+        # transaksi yang sama tidak boleh sama-sama meng-UNDO angka lama.
+        return type(self).objects.select_for_update().filter(pk=self.pk)\
+            .values('product_id', 'date', 'quantity').first()
+
+    @classmethod
+    def _apply_effects(cls, effects, deleted=False):
+        # effects: list (id transaksi, product_id, tanggal, quantity). Quantity negatif = UNDO.
+        # deleted: transaksinya dihapus (dicatat sebagai tombstone di ChangeLog)
+        # Setiap efek dicatat di ledger (satu INSERT massal), lalu digabung:
+        # satu UPDATE berat per produk, satu update rekap per (tanggal, produk).
+        weight_deltas = {}
+        movement_deltas = {}
+        column = 0 if cls.MOVEMENT_FIELD == 'qty_in' else 1
+        for source_id, product_id, day, quantity in effects:
+            weight_deltas[product_id] = weight_deltas.get(product_id, 0) + quantity * cls.STOCK_SIGN
+            movement = movement_deltas.setdefault((day, product_id), [0, 0])
+            movement[column] += quantity
+
+        # Urutan kunci sama di semua jalur tulis: baris produk dulu, baru ledger & rekap,
+        # feed (StockAlert/ChangeLog, lihat lock_feeds) paling akhir
+        for product_id, delta in weight_deltas.items():
+            Product.objects.adjust_weight(product_id, delta)
+        StockMovement.objects.record([
+            (product_id, day, quantity * cls.STOCK_SIGN, cls.SOURCE_TYPE, source_id)
+            for source_id, product_id, day, quantity in effects
+        ])
+        DailyProductMovement.objects.apply_deltas(movement_deltas)
+        Product.objects.filter(pk__in=weight_deltas).refresh_low_stock()
+        # Transaksi & berat produknya berubah -> satu INSERT ke change log
+        source_ids = dict.fromkeys(source_id for source_id, _, _, _ in effects)
+        ChangeLog.objects.record(
+            [(cls, source_id, deleted) for source_id in source_ids]
+            + [(Product, product_id, False) for product_id in weight_deltas]
+        )
+        events.publish('transaction', {'model': cls._meta.model_name, 'ids': list(source_ids), 'deleted': deleted})
+        events.publish('stock', {'products': list(weight_deltas)})
+        bump_generation()
+
     def save(self, *args, **kwargs):
         # Pakai atomic agar database aman kalau error di tengah jalan
         with transaction.atomic():
             # CEK: Apakah ini EDIT data lama? (Punya ID)
-            if self.pk:
-                try:
-                    # Ambil data transaksi VERSI LAMA dari database
-                    old_transaction = TransactionIn.objects.get(pk=self.pk)
-                    
-                    # LOGIKA 1: UNDO (Batalkan efek lama)
-                    # Kembalikan berat produk seperti sebelum transaksi ini ada
-                    # Contoh: 150 - 50 = 100
-                    product_lama = old_transaction.product
-                    product_lama.weight -= old_transaction.quantity
-                    product_lama.save()
-                except TransactionIn.DoesNotExist:
-                    pass 
-
-            # Simpan data transaksi yang BARU (Update angka 50 jadi 200 di database)
+            old = self._locked_snapshot() if self.pk else None
+
             super().save(*args, **kwargs)
 
-            # LOGIKA 2: APPLY (Terapkan efek baru)
-            # Ambil produk terbaru (refresh agar dapat angka 100 tadi)
-            self.product.refresh_from_db()
-            # Tambahkan angka baru: 100 + 200 = 300
-            self.product.weight += self.quantity
-            self.product.save()
+            # LOGIKA 1: UNDO (Batalkan efek lama) + LOGIKA 2: APPLY (Terapkan efek baru)
+            # Keduanya digabung jadi satu delta per produk.
+            # Contoh edit 50 -> 200 di produk yang sama: cukup weight = weight + 150
+            effects = []
+            if old:
+                effects.append((self.pk, old['product_id'], old['date'], -old['quantity']))
+            effects.append((self.pk, self.product_id, self.date, self.quantity))
+            self._apply_effects(effects)
 
     def delete(self, *args, **kwargs):
         with transaction.atomic():
-            # Kalau dihapus, kembalikan stok (Kurangi)
-            self.product.weight -= self.quantity
-            self.product.save()
-            super().delete(*args, **kwargs)
+            # Kalau dihapus, batalkan efeknya pakai angka yang tersimpan di database
+            old = self._locked_snapshot()
+            source_id = self.pk
+            result = super().delete(*args, **kwargs)
+            if old:
+                self._apply_effects([(source_id, old['product_id'], old['date'], -old['quantity'])], deleted=True)
+            return result
+
+    @classmethod
+    def bulk_record(cls, objs):
+        # Simpan banyak transaksi sekaligus (INSERT massal), lalu terapkan
+        # total delta per produk: satu UPDATE per produk, bukan per baris.
+        with transaction.atomic():
+            created = cls.objects.bulk_create(objs)
+            cls._apply_effects([(obj.pk, obj.product_id, obj.date, obj.quantity) for obj in created])
+        return created
+
+class TransactionIn(StockTransaction):
+    STOCK_SIGN = 1
+    MOVEMENT_FIELD = 'qty_in'
+    SOURCE_TYPE = StockMovement.SOURCE_IN
+
+    objects = StockTransactionQuerySet.as_manager()
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transactions_in')
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Urutan list/terbaru (-date, -created_at) & filter rentang tanggal
+            models.Index(fields=['date', 'created_at'], name='trans_in_date_created_idx'),
+            # Filter per produk dalam rentang tanggal
+            models.Index(fields=['product', 'date'], name='trans_in_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - +{self.quantity} Kg"
     
-class TransactionOut(models.Model):
+class TransactionOut(StockTransaction):
+    STOCK_SIGN = -1
+    MOVEMENT_FIELD = 'qty_out'
+    SOURCE_TYPE = StockMovement.SOURCE_OUT
+
+    objects = StockTransactionQuerySet.as_manager()
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transactions_out')
     date = models.DateField()
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        with transaction.atomic():
-            # CEK: Apakah ini EDIT?
-            if self.pk:
-                try:
-                    old_transaction = TransactionOut.objects.get(pk=self.pk)
-                    
-                    # LOGIKA 1: UNDO (Batalkan Pengurangan Lama)
-                    # Kembalikan berat (Ditambah lagi)
-                    product_lama = old_transaction.product
-                    product_lama.weight += old_transaction.quantity
-                    product_lama.save()
-                except TransactionOut.DoesNotExist:
-                    pass
-
-            super().save(*args, **kwargs)
-
-            # LOGIKA 2: APPLY (Kurangi dengan Angka Baru)
-            self.product.refresh_from_db()
-            self.product.weight -= self.quantity
-            self.product.save()
-
-    def delete(self, *args, **kwargs):
-        with transaction.atomic():
-            # Kalau dihapus, kembalikan stok (Tambah lagi)
-            self.product.weight += self.quantity
-            self.product.save()
-            super().delete(*args, **kwargs)
+    class Meta:
+        indexes = [
+            # Urutan list/terbaru (-date, -created_at) & filter rentang tanggal
+            models.Index(fields=['date', 'created_at'], name='trans_out_date_created_idx'),
+            # Filter per produk dalam rentang tanggal
+            models.Index(fields=['product', 'date'], name='trans_out_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"OUT - {self.product.name} - -{self.quantity} Kg"
\ No newline at end of file
@@ -0,0 +1,50 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+# --- Query Paralel (Dashboard & Laporan) ---
+# Agregat dashboard/laporan saling independen. run_queries() menjalankannya bersamaan
+# lewat asyncio.gather; setiap query jalan di thread pool = koneksi database sendiri,
+# jadi latency total ≈ query paling lambat, bukan jumlah semua query.
+#
+# Catatan: ORM async Django (aaggregate, async for) menjalankan semua query di SATU
+# thread (thread_sensitive), jadi tidak benar-benar paralel. Karena itu di sini dipakai
+# sync_to_async(thread_sensitive=False) supaya tiap query dapat koneksi sendiri.
+#
+# Biaya: setiap query paralel membuka koneksi baru (thread pool tidak memegang koneksi,
+# lihat _in_own_connection) dan satu request bisa memakai beberapa koneksi sekaligus.
+# Karena itu fitur ini opt-in (INVENTORY_PARALLEL_QUERIES), sebaiknya di belakang
+# pooler (PgBouncer) dengan max_connections yang cukup.
+
+
+def parallel_enabled():
+    # Koneksi lain tidak bisa melihat data yang belum di-commit di koneksi ini
+    # (mis. di dalam transaction.atomic / TestCase) -> tetap berurutan.
+    return getattr(settings, 'INVENTORY_PARALLEL_QUERIES', False) and not connection.in_atomic_block
+
+
+def _in_own_connection(func):
+    def run():
+        try:
+            return func()
+        finally:
+            # Thread pool hidup selama proses dan tidak pernah memicu request_finished:
+            # koneksi yang dibiarkan terbuka di sini menumpuk per thread (idle) sampai
+            # proses mati. Selalu tutup, apa pun CONN_MAX_AGE-nya.
+            connection.close()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def gather_queries(tasks):
+    results = await asyncio.gather(*(_in_own_connection(func)() for func in tasks.values()))
+    return dict(zip(tasks, results))
+
+
+def run_queries(tasks):
+    # tasks: {nama: fungsi tanpa argumen}. Fungsi harus MENGEVALUASI query-nya
+    # (list(...), aggregate(), first()), bukan mengembalikan QuerySet yang masih lazy.
+    if len(tasks) < 2 or not parallel_enabled():
+        return {name: func() for name, func in tasks.items()}
+    return async_to_sync(gather_queries)(tasks)
@@ -1,11 +1,11 @@
 from rest_framework import serializers
-from .models import Category, Product, TransactionIn, TransactionOut
+from .models import Category, Product, StockAlert, TransactionIn, TransactionOut
 
 # --- Serializer Kategori ---
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'min_weight']
 
 # --- Serializer Produk ---
 class ProductSerializer(serializers.ModelSerializer):
@@ -17,13 +17,25 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'category', 'category_name', 
             'color', 'weight', 'price_per_kg', 
-            'total_value', 'created_at'
+            'total_value', 'min_weight', 'is_low_stock', 'created_at'
             # Field 'stock' dihapus dari sini
         ]
+        read_only_fields = ['is_low_stock']
 
     def get_total_value(self, obj):
         # Total Aset = Berat (Kg) * Harga/Kg
-        return obj.weight * obj.price_per_kg
+        return self.current_weight(obj) * obj.price_per_kg
+
+    def current_weight(self, obj):
+        # Mode ?as_of=YYYY-MM-DD: pakai berat pada tanggal tsb (lihat Product.objects.stock_at)
+        weight_as_of = getattr(obj, 'weight_as_of', None)
+        return obj.weight if weight_as_of is None else weight_as_of
+
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        if getattr(obj, 'weight_as_of', None) is not None:
+            data['weight'] = self.fields['weight'].to_representation(obj.weight_as_of)
+        return data
 
 # --- Serializer Transaksi Masuk ---
 class TransactionInSerializer(serializers.ModelSerializer):
@@ -39,4 +51,12 @@ class TransactionOutSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TransactionOut
-        fields = ['id', 'product', 'product_name', 'date', 'quantity', 'notes', 'created_at']
\ No newline at end of file
+        fields = ['id', 'product', 'product_name', 'date', 'quantity', 'notes', 'created_at']
+
+# --- Serializer Alert Stok Menipis ---
+class StockAlertSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = StockAlert
+        fields = ['id', 'product', 'product_name', 'kind', 'weight', 'threshold', 'created_at']
@@ -1,15 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet, TransactionInViewSet, TransactionOutViewSet, DashboardDataView, ReportView
+from .views import CategoryViewSet, ProductViewSet, TransactionInViewSet, TransactionOutViewSet, StockAlertViewSet, ChangeFeedView, DashboardDataView, ReportView, AnalyticsView, CacheStatsView, event_stream
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet) # Endpoint: /api/categories/
 router.register(r'products', ProductViewSet)    # Endpoint: /api/products/
 router.register(r'transactions-in', TransactionInViewSet)
 router.register(r'transactions-out', TransactionOutViewSet)
+router.register(r'stock-alerts', StockAlertViewSet)   # Endpoint: /api/stock-alerts/?since=<id>
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
     path('dashboard/', DashboardDataView.as_view(), name='dashboard-data'),
-    path('reports/', ReportView.as_view(), name='reports-data')
+    path('reports/', ReportView.as_view(), name='reports-data'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics-data'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('events/', event_stream, name='event-stream'),
 ]
\ No newline at end of file
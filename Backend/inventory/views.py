@@ -1,12 +1,31 @@
-from django.db.models import Sum, F, Count
+from django.db.models import Sum, F, Count, Case, When, Value, IntegerField
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import viewsets, permissions
-from .models import Category, Product, TransactionIn, TransactionOut
-from .serializers import CategorySerializer, ProductSerializer, TransactionInSerializer, TransactionOutSerializer
-from django.db.models.functions import TruncMonth, TruncDay, TruncYear
+from rest_framework import viewsets, permissions, status, filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from users.authentication import StatelessJWTAuthentication, VersionedJWTAuthentication
+from backend.pagination import OptionalCursorPagination
+from .events import format_sse, get_broker
+from .cache import ConditionalGetMixin, cached_response, conditional_response, current_generation, stats as cache_stats
+from .filters import InventoryFilterBackend
+from .importer import InventoryImporter
+from .parallel import run_queries
+from .models import Category, ChangeLog, Product, StockAlert, TransactionIn, TransactionOut, DailyProductMovement, TRANSACTION_VALUE
+from .serializers import (
+    CategorySerializer, ProductSerializer, StockAlertSerializer, TransactionInSerializer, TransactionOutSerializer
+)
+from django.db.models.functions import Coalesce, TruncMonth, TruncDay, TruncQuarter, TruncWeek, TruncYear
 from datetime import timedelta
+import asyncio
+import csv
+from itertools import islice
 import locale
 
 # Set locale ke Indonesia (Opsional, buat nama hari/bulan)
@@ -16,153 +35,483 @@ except:
     pass 
 
 
+# Rentang tanggal [awal, akhir) untuk filter date__gte / date__lt.
+# Dipakai sebagai pengganti date__year / date__month supaya index kolom date tetap terpakai.
+def month_range(day):
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def year_range(day):
+    return day.replace(month=1, day=1), day.replace(year=day.year + 1, month=1, day=1)
+
+
+# --- Bucket Laporan (?granularity=) ---
+# Fungsi Trunc* untuk GROUP BY di SQL + cara menghitung awal bucket berikutnya di Python
+# (dipakai untuk mengisi bucket kosong dengan 0).
+def add_months(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+GRANULARITIES = {
+    'day': (TruncDay, lambda day: day, lambda day: day + timedelta(days=1), lambda day: day.isoformat()),
+    'week': (TruncWeek, lambda day: day - timedelta(days=day.weekday()), lambda day: day + timedelta(days=7),
+             lambda day: '%d-W%02d' % day.isocalendar()[:2]),
+    'month': (TruncMonth, lambda day: day.replace(day=1), lambda day: add_months(day, 1),
+              lambda day: day.strftime('%Y-%m')),
+    'quarter': (TruncQuarter, lambda day: day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1),
+                lambda day: add_months(day, 3), lambda day: f"{day.year}-Q{(day.month - 1) // 3 + 1}"),
+}
+
+
+def bucket_starts(start, end, granularity):
+    # Awal setiap bucket dari start s/d end, sama persis dengan hasil Trunc* di database
+    _, floor, step, _ = GRANULARITIES[granularity]
+    buckets = []
+    current = floor(start)
+    while current <= end:
+        buckets.append(current)
+        current = step(current)
+    return buckets
+
+
 # --- ViewSets (CRUD) ---
-class CategoryViewSet(viewsets.ModelViewSet):
+# Semua view inventory memakai StatelessJWTAuthentication: GET diautentikasi dari claim token tanpa query user.
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all().order_by('-created_at')
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category').order_by('-created_at')
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    # Paging, filter & urutan: ?page_size=&cursor=&category=&search=&ordering=
+    pagination_class = OptionalCursorPagination
+    filter_backends = [filters.OrderingFilter, InventoryFilterBackend, filters.SearchFilter]
+    filter_params = {'category': ('category_id', 'int')}
+    search_fields = ['name', 'category__name']
+    ordering_fields = ['created_at', 'name', 'weight', 'price_per_kg', 'id']
+    ordering = ('-created_at', 'id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?as_of=YYYY-MM-DD -> berat & nilai stok pada akhir tanggal tsb (audit / tutup buku)
+        as_of = self.request.query_params.get('as_of')
+        if as_of and self.request.method == 'GET':
+            day = InventoryFilterBackend().parse_value('as_of', as_of, 'date')
+            queryset = queryset.stock_at(day)
+        return queryset
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        # Upload form-data: file=<csv>, dry_run=1 untuk cek tanpa menyimpan
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": ["File CSV wajib diupload."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', request.query_params.get('dry_run', ''))).lower() in ('1', 'true', 'yes')
+        result = InventoryImporter(dry_run=dry_run).run(upload)
+        return Response(result, status=status.HTTP_400_BAD_REQUEST if result['error_count'] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='low-stock')
+    def low_stock(self, request):
+        # Produk di bawah batas min_weight. Flag is_low_stock dijaga saat tulis,
+        # jadi ini cukup baca index (is_low_stock, weight), tanpa sort seluruh tabel.
+        queryset = Product.objects.select_related('category').filter(is_low_stock=True).order_by('weight', 'id')
+        return Response(self.get_serializer(queryset, many=True).data)
+
+# --- Mixin List Transaksi ---
+class TransactionListMixin:
+    # Paging, filter & urutan yang sama untuk Barang Masuk & Barang Keluar:
+    # ?page_size=&cursor=&start=&end=&product=&category=&search=&ordering=
+    pagination_class = OptionalCursorPagination
+    filter_backends = [filters.OrderingFilter, InventoryFilterBackend, filters.SearchFilter]
+    filter_params = {
+        'start': ('date__gte', 'date'),
+        'end': ('date__lte', 'date'),
+        'product': ('product_id', 'int'),
+        'category': ('product__category_id', 'int'),
+    }
+    search_fields = ['product__name']
+    ordering_fields = ['date', 'created_at', 'quantity', 'id']
+    ordering = ('-date', '-created_at', 'id')
+
+# --- Mixin Export CSV (Untuk Akuntan) ---
+class Echo:
+    # "File" palsu untuk csv.writer: setiap baris langsung dikembalikan, tidak disimpan
+    def write(self, value):
+        return value
+
+def iterate_async(iterator, batch_size):
+    # Di ASGI, StreamingHttpResponse membaca iterator SYNC sampai habis ke memori dulu
+    # (sync_to_async(list)) sebelum mengirim byte pertama. Versi async ini mengambil
+    # `batch_size` potongan per panggilan sync_to_async: memori tetap kecil.
+    # thread_sensitive (default): semua batch jalan di thread request yang sama,
+    # jadi koneksi & cursor database yang dipakai iterator tetap sama.
+    def next_batch():
+        return ''.join(islice(iterator, batch_size))
+
+    async def stream():
+        try:
+            while chunk := await sync_to_async(next_batch)():
+                yield chunk
+        finally:
+            # Klien putus di tengah jalan: tutup iterator (dan cursor-nya)
+            await sync_to_async(iterator.close)()
+    return stream()
+
+
+class ExportTransactionMixin:
+    EXPORT_HEADER = ['id', 'tanggal', 'produk_id', 'produk', 'kategori', 'berat_kg', 'harga_per_kg', 'nilai', 'catatan', 'dibuat']
+    EXPORT_CHUNK_SIZE = 2000
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        # Filter sama dengan list: ?start=&end=&product=&category=&search=&ordering=
+        # values_list + iterator: baris dibaca per chunk dari database & langsung dikirim,
+        # jadi memori tetap kecil walaupun ledger berisi ratusan ribu baris.
+        rows = self.filter_queryset(self.get_queryset())\
+            .annotate(value=TRANSACTION_VALUE)\
+            .values_list(
+                'id', 'date', 'product_id', 'product__name', 'product__category__name',
+                'quantity', 'product__price_per_kg', 'value', 'notes', 'created_at'
+            ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+
+        writer = csv.writer(Echo())
+
+        def stream():
+            yield '\ufeff'  # BOM supaya Excel membaca UTF-8 dengan benar
+            yield writer.writerow(self.EXPORT_HEADER)
+            for row in rows:
+                yield writer.writerow(row)
+
+        content = stream()
+        if isinstance(request._request, ASGIRequest):
+            content = iterate_async(content, self.EXPORT_CHUNK_SIZE)
+
+        filename = f"{self.basename}-{timezone.now().date()}.csv"
+        return StreamingHttpResponse(
+            content,
+            content_type='text/csv; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
 
-class TransactionInViewSet(viewsets.ModelViewSet):
-    queryset = TransactionIn.objects.all().order_by('-date', '-created_at')
+# --- Mixin Input Massal (Scanner Gudang) ---
+class BulkTransactionMixin:
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        # Body: list transaksi, contoh [{"product": 1, "date": "2026-01-05", "quantity": 10}, ...]
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                # Laporkan error per baris (index mengikuti urutan kiriman)
+                errors = {"errors": [{"row": i, "errors": e} for i, e in enumerate(errors) if e]}
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        # Satu transaksi database untuk seluruh batch: semua masuk atau tidak sama sekali
+        created = model.bulk_record([model(**row) for row in serializer.validated_data])
+        return Response(self.get_serializer(created, many=True).data, status=status.HTTP_201_CREATED)
+
+class TransactionInViewSet(ConditionalGetMixin, TransactionListMixin, ExportTransactionMixin, BulkTransactionMixin, viewsets.ModelViewSet):
+    queryset = TransactionIn.objects.select_related('product').order_by('-date', '-created_at')
     serializer_class = TransactionInSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
 
-class TransactionOutViewSet(viewsets.ModelViewSet):
-    queryset = TransactionOut.objects.all().order_by('-date', '-created_at')
+class TransactionOutViewSet(ConditionalGetMixin, TransactionListMixin, ExportTransactionMixin, BulkTransactionMixin, viewsets.ModelViewSet):
+    queryset = TransactionOut.objects.select_related('product').order_by('-date', '-created_at')
     serializer_class = TransactionOutSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
 
 
-# --- API DASHBOARD (WIDGETS) ---
-class DashboardDataView(APIView):
+# --- Feed Alert Stok Menipis ---
+# Polling ringan: GET /api/stock-alerts/?since=<cursor> hanya mengembalikan alert
+# yang lebih baru dari cursor (urut id naik). Simpan "cursor" dari respons untuk polling berikutnya.
+# Id alert terlihat sesuai urutan commit (lihat lock_feeds di models.py): tidak ada alert
+# dengan id lebih kecil dari cursor yang muncul belakangan.
+class StockAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = StockAlert.objects.select_related('product').order_by('id')
+    serializer_class = StockAlertSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    filter_backends = [InventoryFilterBackend]
+    filter_params = {'since': ('id__gt', 'int'), 'product': ('product_id', 'int')}
+    FEED_LIMIT = 200
+
+    def list(self, request, *args, **kwargs):
+        alerts = list(self.filter_queryset(self.get_queryset())[:self.FEED_LIMIT + 1])
+        has_more = len(alerts) > self.FEED_LIMIT
+        alerts = alerts[:self.FEED_LIMIT]
+        # Tidak ada alert baru -> cursor tetap (nilai ?since sudah divalidasi filter backend)
+        cursor = alerts[-1].id if alerts else int(request.query_params.get('since') or 0)
+        return Response({
+            "results": self.get_serializer(alerts, many=True).data,
+            "cursor": cursor,
+            "has_more": has_more,
+        })
 
-    def get(self, request):
-        # 1. Total Aset (Berat * Harga)
-        total_asset = Product.objects.aggregate(
-            total=Sum(F('weight') * F('price_per_kg'))
-        )['total'] or 0
 
-        # 2. Total Berat Gudang
-        total_weight = Product.objects.aggregate(
-            total=Sum('weight')
-        )['total'] or 0
+# --- Change Feed (Sinkronisasi Inkremental) ---
+# GET /api/changes/?since=<cursor> -> data yang dibuat/diubah/dihapus setelah cursor.
+# Respons: {"cursor": ..., "has_more": ..., "changes": {"product": {"updated": [...], "deleted": [id, ...]}, ...}}
+# Mulai dari since=0 untuk salinan penuh, lalu simpan "cursor" untuk panggilan berikutnya.
+# Cursor bisa dipercaya: id ChangeLog terlihat sesuai urutan commit (lihat lock_feeds di models.py).
+class ChangeFeedView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    FEED_LIMIT = 500
 
-        # 3. Stok Menipis (Logic: Ambil barang dengan berat terendah)
-        lowest_product = Product.objects.order_by('weight').first()
-        if lowest_product:
-            lowest_stock_data = {
-                "name": lowest_product.name,
-                "stock": lowest_product.weight 
-            }
-        else:
-            lowest_stock_data = { "name": "-", "stock": 0 }
+    # model_name di ChangeLog -> (queryset, serializer) untuk data terbarunya
+    SOURCES = {
+        'category': (Category.objects.all(), CategorySerializer),
+        'product': (Product.objects.select_related('category'), ProductSerializer),
+        'transactionin': (TransactionIn.objects.select_related('product'), TransactionInSerializer),
+        'transactionout': (TransactionOut.objects.select_related('product'), TransactionOutSerializer),
+    }
 
-        # 4. Pendapatan Bulan Ini
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        trans_out_month = TransactionOut.objects.filter(
-            date__month=current_month, 
-            date__year=current_year
+    def get(self, request):
+        raw = request.query_params.get('since')
+        since = InventoryFilterBackend().parse_value('since', raw, 'int') if raw else 0
+        entries = list(
+            ChangeLog.objects.filter(id__gt=since).order_by('id')
+            .values_list('id', 'model', 'object_id', 'deleted')[:self.FEED_LIMIT + 1]
         )
-        income_month = 0
-        for item in trans_out_month:
-            income_month += item.quantity * item.product.price_per_kg
+        has_more = len(entries) > self.FEED_LIMIT
+        entries = entries[:self.FEED_LIMIT]
+
+        # Satu objek bisa berubah berkali-kali: yang dipakai hanya status terakhirnya
+        latest = {}
+        for _, model, object_id, deleted in entries:
+            latest[(model, object_id)] = deleted
+
+        changes = {}
+        for model, (queryset, serializer_class) in self.SOURCES.items():
+            updated_ids = [pk for (name, pk), deleted in latest.items() if name == model and not deleted]
+            deleted_ids = {pk for (name, pk), deleted in latest.items() if name == model and deleted}
+            rows = list(queryset.filter(pk__in=updated_ids)) if updated_ids else []
+            # Tercatat berubah tapi sudah tidak ada (mis. dihapus di luar jalur model) -> tombstone
+            deleted_ids.update(set(updated_ids) - {row.pk for row in rows})
+            if rows or deleted_ids:
+                changes[model] = {
+                    "updated": serializer_class(rows, many=True).data,
+                    "deleted": sorted(deleted_ids),
+                }
 
+        return Response({
+            "cursor": entries[-1][0] if entries else since,
+            "has_more": has_more,
+            "changes": changes,
+        })
+
+
+# --- API DASHBOARD (WIDGETS) ---
+class DashboardDataView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    # Widget yang bisa dipilih lewat ?widgets=total_asset,recent_in,...
+    # Tanpa parameter = semua widget (sama seperti sebelumnya)
+    WIDGETS = ('total_asset', 'total_stock', 'lowest_stock_item', 'low_stock', 'income_month', 'recent_in', 'recent_out')
+
+    def get_widgets(self, request):
+        raw = request.query_params.get('widgets')
+        if not raw:
+            return set(self.WIDGETS)
+        widgets = {name.strip() for name in raw.split(',') if name.strip()}
+        invalid = widgets - set(self.WIDGETS)
+        if invalid:
+            raise ValidationError({"widgets": f"Widget tidak dikenal: {', '.join(sorted(invalid))}"})
+        return widgets
+
+    @conditional_response
+    @cached_response('widgets')
+    def get(self, request):
+        widgets = self.get_widgets(request)
+        month_start, month_end = month_range(timezone.now().date())
+        low_stock = Product.objects.filter(is_low_stock=True)
+
+        # Query per widget saling independen -> dijalankan paralel (lihat inventory/parallel.py)
+        tasks = {}
+        # 1 & 2. Total Aset (Berat * Harga) + Total Berat Gudang -> SATU aggregate
+        if widgets & {'total_asset', 'total_stock'}:
+            tasks['totals'] = lambda: Product.objects.aggregate(
+                total_asset=Sum(F('weight') * F('price_per_kg')),
+                total_stock=Sum('weight')
+            )
+        # 3. Stok Menipis (Logic: Ambil barang dengan berat terendah)
+        if 'lowest_stock_item' in widgets:
+            tasks['lowest_stock_item'] = lambda: Product.objects.order_by('weight').values('name', 'weight').first()
+        # 3b. Semua produk di bawah batas min_weight (flag is_low_stock, ter-index)
+        if 'low_stock' in widgets:
+            tasks['low_stock_count'] = low_stock.count
+            tasks['low_stock_items'] = lambda: list(
+                low_stock.order_by('weight', 'id').values('id', 'name', 'weight')[:5]
+            )
+        # 4. Pendapatan Bulan Ini
+        # Dihitung di database: SUM(quantity * price_per_kg), bukan loop per transaksi
+        if 'income_month' in widgets:
+            tasks['income_month'] = lambda: TransactionOut.objects.filter(
+                date__gte=month_start,
+                date__lt=month_end
+            ).totals()['value']
         # 5. Tabel Terbaru
-        recent_in = TransactionIn.objects.all().order_by('-date', '-created_at')[:5]
-        recent_out = TransactionOut.objects.all().order_by('-date', '-created_at')[:5]
+        # select_related: product_name ikut di-JOIN, tidak query per baris
+        if 'recent_in' in widgets:
+            tasks['recent_in'] = lambda: list(
+                TransactionIn.objects.select_related('product').order_by('-date', '-created_at')[:5]
+            )
+        if 'recent_out' in widgets:
+            tasks['recent_out'] = lambda: list(
+                TransactionOut.objects.select_related('product').order_by('-date', '-created_at')[:5]
+            )
+        results = run_queries(tasks)
+
+        data = {}
+        if 'totals' in results:
+            for key in ('total_asset', 'total_stock'):
+                if key in widgets:
+                    data[key] = results['totals'][key] or 0
+
+        if 'lowest_stock_item' in widgets:
+            lowest_product = results['lowest_stock_item']
+            if lowest_product:
+                data["lowest_stock_item"] = {
+                    "name": lowest_product['name'],
+                    "stock": lowest_product['weight']
+                }
+            else:
+                data["lowest_stock_item"] = { "name": "-", "stock": 0 }
+
+        if 'low_stock' in widgets:
+            data["low_stock"] = {
+                "count": results['low_stock_count'],
+                "items": [
+                    {"id": item['id'], "name": item['name'], "stock": item['weight']}
+                    for item in results['low_stock_items']
+                ]
+            }
 
-        in_serializer = TransactionInSerializer(recent_in, many=True)
-        out_serializer = TransactionOutSerializer(recent_out, many=True)
+        if 'income_month' in widgets:
+            data["income_month"] = results['income_month']
 
-        return Response({
-            "total_asset": total_asset,
-            "total_stock": total_weight, 
-            "lowest_stock_item": lowest_stock_data,
-            "income_month": income_month,
-            "recent_in": in_serializer.data,
-            "recent_out": out_serializer.data
-        })
+        if 'recent_in' in widgets:
+            data["recent_in"] = TransactionInSerializer(results['recent_in'], many=True).data
+        if 'recent_out' in widgets:
+            data["recent_out"] = TransactionOutSerializer(results['recent_out'], many=True).data
+
+        return Response(data)
     
 
 # --- API LAPORAN (CHARTS) ---
 class ReportView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-
+    authentication_classes = [StatelessJWTAuthentication]
+
+    # ?start=&end=&granularity=day|week|month|quarter -> rentang bebas (bucket di SQL).
+    # Tanpa parameter ini tetap pakai ?period=mingguan|bulanan|tahunan seperti sebelumnya.
+    RANGE_PARAMS = ('start', 'end', 'granularity')
+    MAX_BUCKETS = 400
+    DEFAULT_RANGE_DAYS = 30
+
+    def get_range(self, request, today):
+        params = request.query_params
+        parse = InventoryFilterBackend().parse_value
+        end = parse('end', params['end'], 'date') if params.get('end') else today
+        start = parse('start', params['start'], 'date') if params.get('start') \
+            else end - timedelta(days=self.DEFAULT_RANGE_DAYS - 1)
+        granularity = params.get('granularity') or 'day'
+        if granularity not in GRANULARITIES:
+            raise ValidationError({"granularity": f"Pilihan: {', '.join(GRANULARITIES)}."})
+        if start > end:
+            raise ValidationError({"start": "Tanggal awal harus sebelum tanggal akhir."})
+
+        buckets = bucket_starts(start, end, granularity)
+        if len(buckets) > self.MAX_BUCKETS:
+            raise ValidationError({"granularity": (
+                f"Terlalu banyak bucket ({len(buckets)}, maksimal {self.MAX_BUCKETS}). "
+                "Pakai granularity yang lebih besar atau rentang yang lebih pendek."
+            )})
+        return start, end, granularity, buckets
+
+    @staticmethod
+    def fill_bar(rows, labels, label_of):
+        # rows: hasil bar_query (kolom bucket, total_in, total_out).
+        # Bucket tanpa transaksi tetap muncul dengan nilai 0
+        chart_data_out = {label: 0 for label in labels}
+        chart_data_in = dict(chart_data_out)
+        for item in rows:
+            chart_data_out[label_of(item['bucket'])] = item['total_out']
+            chart_data_in[label_of(item['bucket'])] = item['total_in']
+        return chart_data_out, chart_data_in
+
+    @conditional_response
+    @cached_response('period', *RANGE_PARAMS)
     def get(self, request):
         period = request.query_params.get('period', 'bulanan') 
         today = timezone.now().date()
+        end_date = None
         
-        # Variabel untuk menampung data chart
-        bar_labels = []
-        bar_values_out = [] # Data Keluar (Merah)
-        bar_values_in = []  # Data Masuk (Biru)
+        # Default (period tidak dikenal): bar chart kosong
+        bar_query = DailyProductMovement.objects.none()
+        date_info = ""
+        # Label semua bucket (urut) & cara mengubah nilai kolom bucket jadi label
+        bucket_labels, bucket_label = [], str
         
         start_date = today # Default
 
         # ================= LOGIC BAR CHART (MASUK & KELUAR) =================
-        if period == 'mingguan':
+        if any(request.query_params.get(name) for name in self.RANGE_PARAMS):
+            start_date, end_date, granularity, buckets = self.get_range(request, today)
+            date_info = f"{start_date.strftime('%d %B %Y')} s/d {end_date.strftime('%d %B %Y')}"
+            trunc, _, _, label = GRANULARITIES[granularity]
+
+            # GROUP BY bucket di database: berapa pun panjang rentangnya, hasilnya maksimal MAX_BUCKETS baris
+            bar_query = DailyProductMovement.objects.filter(date__gte=start_date, date__lte=end_date)\
+                .annotate(bucket=trunc('date')).values('bucket')\
+                .annotate(total_in=Sum('qty_in'), total_out=Sum('qty_out')).order_by('bucket')
+            bucket_labels, bucket_label = [label(bucket) for bucket in buckets], label
+
+        elif period == 'mingguan':
             start_date = today - timedelta(days=6)
             date_info = f"{start_date.strftime('%d %B')} s/d {today.strftime('%d %B %Y')}"
             
-            # Init Chart Data (7 Hari ke belakang)
-            chart_data_out = {}
-            chart_data_in = {}
+            # Bucket = 7 hari ke belakang, label = nama hari
+            bucket_labels = [(start_date + timedelta(days=i)).strftime('%A') for i in range(7)]
+            bucket_label = lambda day: day.strftime('%A')
             
-            for i in range(7):
-                d = start_date + timedelta(days=i)
-                label = d.strftime('%A') # Nama Hari
-                chart_data_out[label] = 0
-                chart_data_in[label] = 0
-            
-            # Query Keluar
-            data_out = TransactionOut.objects.filter(date__gte=start_date)\
-                .annotate(day=TruncDay('date')).values('day').annotate(total=Sum('quantity')).order_by('day')
-            for item in data_out:
-                chart_data_out[item['day'].strftime('%A')] = item['total']
-
-            # Query Masuk
-            data_in = TransactionIn.objects.filter(date__gte=start_date)\
-                .annotate(day=TruncDay('date')).values('day').annotate(total=Sum('quantity')).order_by('day')
-            for item in data_in:
-                chart_data_in[item['day'].strftime('%A')] = item['total']
-
-            bar_labels = list(chart_data_out.keys())
-            bar_values_out = list(chart_data_out.values())
-            bar_values_in = list(chart_data_in.values())
+            # Query Masuk & Keluar sekaligus dari rekap harian
+            bar_query = DailyProductMovement.objects.filter(date__gte=start_date)\
+                .values(bucket=F('date')).annotate(total_in=Sum('qty_in'), total_out=Sum('qty_out')).order_by('bucket')
 
         elif period == 'bulanan':
             start_date = today.replace(day=1)
             date_info = f"{start_date.strftime('%B %Y')}"
             
-            # Query Transaksi Bulan Ini
-            trans_out = TransactionOut.objects.filter(date__year=today.year, date__month=today.month)
-            trans_in = TransactionIn.objects.filter(date__year=today.year, date__month=today.month)
-
-            weeks_data_out = {"Minggu 1": 0, "Minggu 2": 0, "Minggu 3": 0, "Minggu 4": 0}
-            weeks_data_in = {"Minggu 1": 0, "Minggu 2": 0, "Minggu 3": 0, "Minggu 4": 0}
-
-            # Helper function untuk grouping minggu
-            def fill_weeks(transactions, data_dict):
-                for t in transactions:
-                    day = t.date.day
-                    if day <= 7: data_dict["Minggu 1"] += t.quantity
-                    elif day <= 14: data_dict["Minggu 2"] += t.quantity
-                    elif day <= 21: data_dict["Minggu 3"] += t.quantity
-                    else: data_dict["Minggu 4"] += t.quantity
-
-            fill_weeks(trans_out, weeks_data_out)
-            fill_weeks(trans_in, weeks_data_in)
-
-            bar_labels = list(weeks_data_out.keys())
-            bar_values_out = list(weeks_data_out.values())
-            bar_values_in = list(weeks_data_in.values())
+            # Query Rekap Harian Bulan Ini (maksimal 31 baris)
+            month_start, month_end = month_range(today)
+            # Minggu ke-n = tanggal 1-7, 8-14, ... dihitung di SQL lewat CASE per rentang tanggal
+            # (bukan pembagian: EXTRACT di PostgreSQL menghasilkan numeric, jadi tidak dibulatkan).
+            # Tanggal 29-31 masuk "Minggu 5" (tidak lagi digabung ke Minggu 4).
+            week = Case(
+                *[When(date__day__lte=7 * n, then=Value(n)) for n in range(1, 5)],
+                default=Value(5), output_field=IntegerField(),
+            )
+            bar_query = DailyProductMovement.objects.filter(date__gte=month_start, date__lt=month_end)\
+                .annotate(bucket=week).values('bucket')\
+                .annotate(total_in=Sum('qty_in'), total_out=Sum('qty_out')).order_by('bucket')
+
+            week_count = ((month_end - month_start).days + 6) // 7
+            bucket_label = lambda week: f"Minggu {week}"
+            bucket_labels = [bucket_label(week) for week in range(1, week_count + 1)]
 
         elif period == 'tahunan':
             start_date = today.replace(month=1, day=1)
@@ -173,48 +522,60 @@ class ReportView(APIView):
                 1: "Januari", 2: "Februari", 3: "Maret", 4: "April", 5: "Mei", 6: "Juni",
                 7: "Juli", 8: "Agustus", 9: "September", 10: "Oktober", 11: "November", 12: "Desember"
             }
-            chart_data_out = {v: 0 for v in month_map.values()}
-            chart_data_in = {v: 0 for v in month_map.values()}
-
-            # Query Keluar
-            query_out = TransactionOut.objects.filter(date__year=today.year)\
-                .annotate(month=TruncMonth('date')).values('month').annotate(total=Sum('quantity')).order_by('month')
-            for item in query_out:
-                chart_data_out[month_map[item['month'].month]] = item['total']
+            bucket_labels = list(month_map.values())
+            bucket_label = lambda month: month_map[month.month]
 
-            # Query Masuk
-            query_in = TransactionIn.objects.filter(date__year=today.year)\
-                .annotate(month=TruncMonth('date')).values('month').annotate(total=Sum('quantity')).order_by('month')
-            for item in query_in:
-                chart_data_in[month_map[item['month'].month]] = item['total']
-
-            bar_labels = list(chart_data_out.keys())
-            bar_values_out = list(chart_data_out.values())
-            bar_values_in = list(chart_data_in.values())
+            # Query Masuk & Keluar sekaligus dari rekap harian
+            year_start, year_end = year_range(today)
+            bar_query = DailyProductMovement.objects.filter(date__gte=year_start, date__lt=year_end)\
+                .annotate(bucket=TruncMonth('date')).values('bucket')\
+                .annotate(total_in=Sum('qty_in'), total_out=Sum('qty_out')).order_by('bucket')
 
         # ================= LOGIC PIE CHART (PER PRODUK) =================
         
+        movements = DailyProductMovement.objects.filter(date__gte=start_date)
+        if end_date:
+            movements = movements.filter(date__lte=end_date)
+
         # Pie Out (Keluar)
-        pie_out_query = TransactionOut.objects.filter(date__gte=start_date)\
-            .values('product__name').annotate(total=Sum('quantity')).order_by('-total')
-        pie_labels_out = [item['product__name'] for item in pie_out_query]
-        pie_values_out = [item['total'] for item in pie_out_query]
+        # Dikelompokkan per id produk (bukan per nama): produk beda dengan nama sama tidak tergabung
+        pie_out_query = movements.filter(qty_out__gt=0)\
+            .values('product_id', 'product__name').annotate(total=Sum('qty_out')).order_by('-total')
 
         # Pie In (Masuk) -- NEW LOGIC
-        pie_in_query = TransactionIn.objects.filter(date__gte=start_date)\
-            .values('product__name').annotate(total=Sum('quantity')).order_by('-total')
-        pie_labels_in = [item['product__name'] for item in pie_in_query]
-        pie_values_in = [item['total'] for item in pie_in_query]
+        pie_in_query = movements.filter(qty_in__gt=0)\
+            .values('product_id', 'product__name').annotate(total=Sum('qty_in')).order_by('-total')
+
+        # Bar, 2 pie & ringkasan saling independen -> dijalankan paralel (lihat inventory/parallel.py)
+        results = run_queries({
+            'bar': lambda: list(bar_query),
+            'pie_out': lambda: list(pie_out_query),
+            'pie_in': lambda: list(pie_in_query),
+            # Berat & nilai masuk/keluar dihitung sekaligus dari rekap harian (satu query)
+            'totals': lambda: movements.aggregate(
+                sum_qty_in=Sum('qty_in'), sum_qty_out=Sum('qty_out'),
+                sum_value_in=Sum('value_in'), sum_value_out=Sum('value_out')
+            ),
+        })
+
+        chart_data_out, chart_data_in = self.fill_bar(results['bar'], bucket_labels, bucket_label)
+        bar_labels = list(chart_data_out.keys())
+        bar_values_out = list(chart_data_out.values())
+        bar_values_in = list(chart_data_in.values())
+
+        pie_labels_out = [item['product__name'] for item in results['pie_out']]
+        pie_values_out = [item['total'] for item in results['pie_out']]
+        pie_labels_in = [item['product__name'] for item in results['pie_in']]
+        pie_values_in = [item['total'] for item in results['pie_in']]
 
         # ================= SUMMARY =================
-        trans_in_sum = TransactionIn.objects.filter(date__gte=start_date)
-        trans_out_sum = TransactionOut.objects.filter(date__gte=start_date)
+        totals = results['totals']
 
-        total_in = trans_in_sum.aggregate(sum=Sum('quantity'))['sum'] or 0
-        total_out = trans_out_sum.aggregate(sum=Sum('quantity'))['sum'] or 0
+        total_in = totals['sum_qty_in'] or 0
+        total_out = totals['sum_qty_out'] or 0
         
-        revenue = sum(t.quantity * t.product.price_per_kg for t in trans_out_sum)
-        asset_in = sum(t.quantity * t.product.price_per_kg for t in trans_in_sum)
+        revenue = totals['sum_value_out'] or 0
+        asset_in = totals['sum_value_in'] or 0
         asset_change = asset_in - revenue
 
         return Response({
@@ -234,4 +595,167 @@ class ReportView(APIView):
                 "asset_change": asset_change,
                 "date_info": date_info
             }
-        })
\ No newline at end of file
+        })
+
+
+# --- API ANALITIK (DRILL-DOWN) ---
+# GET /api/analytics/?group_by=category|product|color&start=&end=&category=&sort=&top=
+# Qty & nilai masuk/keluar per kelompok dari rekap harian. Hanya top-N (urut `sort`)
+# yang dikirim per baris; sisanya digabung jadi satu bucket "Lainnya".
+# Respons kolumnar: labels + array nilai sejajar (lebih ringkas dari list of dict).
+class AnalyticsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    # group_by -> (id kelompok, label; None = label sama dengan id).
+    # Warna kosong ('') dan NULL sama-sama "Tanpa Warna" -> satu kelompok dengan id ''.
+    GROUPS = {
+        'category': (F('product__category_id'), F('product__category__name')),
+        'product': (F('product_id'), F('product__name')),
+        'color': (Coalesce('product__color', Value('')), None),
+    }
+    METRICS = ('qty_in', 'qty_out', 'value_in', 'value_out')
+    DEFAULT_TOP = 10
+    MAX_TOP = 100
+    # id bucket "Lainnya": id kelompok asli selalu pk positif atau teks warna, jadi tidak bentrok
+    OTHERS_ID = -1
+    OTHERS_LABEL = "Lainnya"
+    NO_COLOR_LABEL = "Tanpa Warna"
+
+    filter_params = {
+        'start': ('date__gte', 'date'),
+        'end': ('date__lte', 'date'),
+        'category': ('product__category_id', 'int'),
+    }
+
+    def get_choice(self, request, param, choices, default):
+        value = request.query_params.get(param) or default
+        if value not in choices:
+            raise ValidationError({param: f"Pilihan: {', '.join(choices)}."})
+        return value
+
+    def get_top(self, request):
+        raw = request.query_params.get('top')
+        top = InventoryFilterBackend().parse_value('top', raw, 'int') if raw else self.DEFAULT_TOP
+        if not 1 <= top <= self.MAX_TOP:
+            raise ValidationError({"top": f"Harus antara 1 dan {self.MAX_TOP}."})
+        return top
+
+    @conditional_response
+    @cached_response('group_by', 'sort', 'top', *filter_params)
+    def get(self, request):
+        group_by = self.get_choice(request, 'group_by', self.GROUPS, 'category')
+        sort = self.get_choice(request, 'sort', self.METRICS, 'value_out')
+        top = self.get_top(request)
+        group_id, group_label = self.GROUPS[group_by]
+        columns = {'group_id': group_id}
+        if group_label is not None:
+            columns['group_label'] = group_label
+
+        movements = InventoryFilterBackend().filter_queryset(request, DailyProductMovement.objects.all(), self)
+        sums = {f'total_{metric}': Sum(metric) for metric in self.METRICS}
+        # Top-N + 1 baris (untuk tahu ada sisa atau tidak) & total keseluruhan: dua query, paralel
+        results = run_queries({
+            'groups': lambda: list(
+                movements.values(**columns).annotate(**sums)
+                .order_by(f'-total_{sort}', 'group_id')[:top + 1]
+            ),
+            'total': lambda: movements.aggregate(**sums),
+        })
+        groups = results['groups'][:top]
+        total = {metric: results['total'][f'total_{metric}'] or 0 for metric in self.METRICS}
+
+        data = {
+            "group_by": group_by,
+            "sort": sort,
+            "ids": [row['group_id'] for row in groups],
+            "labels": [row.get('group_label', row['group_id']) or self.NO_COLOR_LABEL for row in groups],
+        }
+        for metric in self.METRICS:
+            data[metric] = [row[f'total_{metric}'] for row in groups]
+
+        # Sisa di luar top-N = total - jumlah top-N (tanpa mengirim semua baris)
+        if len(results['groups']) > top:
+            data["ids"].append(self.OTHERS_ID)
+            data["labels"].append(self.OTHERS_LABEL)
+            for metric in self.METRICS:
+                data[metric].append(total[metric] - sum(data[metric]))
+
+        data["total"] = total
+        return Response(data)
+
+
+# --- API STATISTIK CACHE ---
+class CacheStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    def get(self, request):
+        # Counter per proses (per worker gunicorn)
+        return Response({
+            "hits": cache_stats['hits'],
+            "misses": cache_stats['misses'],
+            "generation": current_generation()
+        })
+
+
+# --- Live Events (Server-Sent Events) ---
+# GET /api/events/ -> koneksi text/event-stream yang terus terbuka. Event: 'stock',
+# 'transaction', 'low_stock' (lihat inventory/events.py). View ini async: di bawah ASGI
+# setiap koneksi idle hanya berupa coroutine yang menunggu queue, tanpa thread per client.
+HEARTBEAT_SECONDS = 15
+
+
+async def authenticate_stream(request):
+    # EventSource di browser tidak bisa mengirim header Authorization,
+    # jadi access token boleh juga dikirim lewat ?token=
+    auth = VersionedJWTAuthentication()
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        validated = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def event_stream(request):
+    # Stream tanpa akhir hanya bisa dilayani server ASGI (uvicorn, lihat Procfile).
+    # Di WSGI (mis. `manage.py runserver`) Django akan membaca generator async sampai
+    # habis -> request menggantung selamanya. Untuk development jalankan:
+    #   uvicorn backend.asgi:application --reload
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Live update butuh server ASGI (uvicorn)."}, status=501)
+
+    user = await authenticate_stream(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Token tidak valid atau tidak dikirim."}, status=401)
+
+    # Reconnect otomatis EventSource mengirim Last-Event-ID -> event yang terlewat diputar ulang
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+
+    async def stream():
+        broker = get_broker()
+        queue = broker.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Komentar SSE: menjaga koneksi tetap hidup di balik proxy
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework import permissions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+# --- Autentikasi JWT Cepat (Tanpa Query User) ---
+# Saat login, role & token_version user ditulis sebagai claim di token.
+# Endpoint baca (GET) inventory cukup percaya claim tsb: user TIDAK di-load dari database.
+# Status user (aktif / role / versi token) dicek lewat cache per proses ber-TTL,
+# jadi user yang dinonaktifkan / diganti role-nya tertolak paling lambat setelah TTL.
+#
+# Pencabutan token: User.save() menaikkan token_version saat password diganti, role berubah
+# atau akun dinonaktifkan (lihat users/models.py). Semua token dengan 'ver' lama ditolak,
+# termasuk refresh token. Di proses yang melakukan perubahan, cache langsung di-invalidate.
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'ver'
+
+
+def issue_tokens(user):
+    # Dipakai LoginView: claim ikut tersalin ke access token (& access token hasil refresh)
+    refresh = RefreshToken.for_user(user)
+    refresh[ROLE_CLAIM] = user.role
+    refresh[VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def token_version(validated_token):
+    # Token tanpa claim 'ver' (diterbitkan sebelum ada versi) dianggap versi 0
+    return validated_token.get(VERSION_CLAIM, 0)
+
+
+class UserStateCache:
+    # LRU user_id -> (kedaluwarsa, state). state = dict is_active/role/token_version, None = user tidak ada.
+    # Ukuran dibatasi AUTH_USER_STATE_CACHE_SIZE: user yang paling lama tidak dipakai dibuang duluan.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AUTH_USER_STATE_TTL', 30)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'AUTH_USER_STATE_CACHE_SIZE', 10000)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        # Miss / kedaluwarsa: ambil dari database
+        state = User.objects.filter(pk=user_id).values('is_active', 'role', 'token_version').first()
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return state
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+user_states = UserStateCache()
+
+
+class ClaimsUser(TokenUser):
+    # User "ringan" dari isi token: cukup untuk permission (is_authenticated, role)
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+
+def check_token_state(state, validated_token):
+    # state: dict dari UserStateCache / user lengkap (is_active, role, token_version)
+    if state is None or not state['is_active']:
+        raise AuthenticationFailed("User tidak aktif atau tidak ditemukan.", code='user_inactive')
+    if state['token_version'] != token_version(validated_token):
+        raise AuthenticationFailed("Sesi sudah tidak berlaku, silakan login ulang.", code='token_not_valid')
+    if ROLE_CLAIM in validated_token and state['role'] != validated_token[ROLE_CLAIM]:
+        raise AuthenticationFailed("Sesi sudah tidak berlaku, silakan login ulang.", code='token_not_valid')
+
+
+class VersionedJWTAuthentication(JWTAuthentication):
+    # JWTAuthentication biasa (user lengkap dari database) + cek token_version & role.
+    # Dipakai sebagai default DRF, jadi endpoint users/ juga menolak token yang sudah dicabut.
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        check_token_state(
+            {'is_active': user.is_active, 'role': user.role, 'token_version': user.token_version},
+            validated_token,
+        )
+        return user
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    # Refresh token versi lama tidak boleh menghasilkan access token baru.
+    # Refresh jarang terjadi, jadi langsung cek ke database (bukan cache).
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        state = User.objects.filter(
+            pk=refresh.get(api_settings.USER_ID_CLAIM)
+        ).values('is_active', 'role', 'token_version').first()
+        check_token_state(state, refresh)
+        return super().validate(attrs)
+
+
+class StatelessJWTAuthentication(VersionedJWTAuthentication):
+    # GET/HEAD/OPTIONS -> ClaimsUser tanpa query (selama cache status user masih berlaku).
+    # Method lain (tulis) tetap memuat user lengkap dari database.
+    def authenticate(self, request):
+        if request.method not in permissions.SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_claims_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token or VERSION_CLAIM not in validated_token:
+            # Token lama (sebelum claim role/ver ada): jalur biasa
+            return self.get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        check_token_state(user_states.get(user.id), validated_token)
+        return user
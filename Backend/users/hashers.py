@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+# --- Hasher Password (Biaya Bisa Diatur) ---
+# PBKDF2 bawaan Django sengaja mahal (±1 juta iterasi) dan makan CPU worker tiap login.
+# Jumlah iterasi diatur lewat PASSWORD_HASH_ITERATIONS (None = bawaan Django).
+# Hash lama tetap valid (jumlah iterasi tersimpan di hash-nya) dan otomatis
+# di-hash ulang dengan setting baru saat user login berikutnya.
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
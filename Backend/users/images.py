@@ -0,0 +1,95 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.utils.text import slugify
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# --- Pipeline Foto Profil ---
+# File upload TIDAK disimpan apa adanya (foto kamera bisa beberapa MB). Saat upload:
+#   1. ukuran file & jumlah piksel dibatasi,
+#   2. rotasi EXIF diterapkan ke piksel (foto HP tidak miring lagi),
+#   3. semua metadata (EXIF, GPS, profil warna) dibuang,
+#   4. gambar utama diperkecil ke maksimal PROFILE_IMAGE_MAX_SIZE px,
+#   5. avatar persegi dibuat untuk tiap ukuran di AVATAR_SIZES.
+# Header cukup memuat avatar 64 px (beberapa KB), bukan file asli.
+AVATAR_SIZES = (64, 256)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+}
+
+
+def image_format():
+    return getattr(settings, 'PROFILE_IMAGE_FORMAT', 'WEBP')
+
+
+def open_upload(upload):
+    max_bytes = getattr(settings, 'PROFILE_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+    if upload.size > max_bytes:
+        raise ValidationError(f"Ukuran foto maksimal {max_bytes // (1024 * 1024)} MB.")
+
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        # Header mengaku > 2x Image.MAX_IMAGE_PIXELS: Pillow menolak sebelum cek kita di bawah
+        raise ValidationError("Resolusi foto terlalu besar.")
+    except (UnidentifiedImageError, OSError):
+        raise ValidationError("File bukan gambar yang valid.")
+    if image.width * image.height > getattr(settings, 'PROFILE_IMAGE_MAX_PIXELS', 50_000_000):
+        raise ValidationError("Resolusi foto terlalu besar.")
+
+    # JPEG bisa di-decode langsung di resolusi kecil (jauh lebih cepat untuk foto kamera)
+    max_size = getattr(settings, 'PROFILE_IMAGE_MAX_SIZE', 1024)
+    image.draft('RGB', (max_size, max_size))
+    try:
+        image = ImageOps.exif_transpose(image)
+    except (OSError, SyntaxError):
+        raise ValidationError("File gambar rusak.")
+    return image
+
+
+def normalize_mode(image, fmt):
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha and fmt != 'JPEG':
+        return image.convert('RGBA')
+    if has_alpha:
+        # JPEG tidak punya transparansi: tempel di latar putih
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, fmt):
+    # Tidak mengirim exif= / icc_profile= -> metadata tidak ikut tersimpan
+    buffer = BytesIO()
+    image.save(buffer, fmt, **SAVE_OPTIONS[fmt])
+    return ContentFile(buffer.getvalue())
+
+
+def process_profile_image(upload):
+    # Hasil: {'original': ContentFile, 64: ContentFile, 256: ContentFile, ...}
+    # ValidationError kalau file ditolak.
+    fmt = image_format()
+    main = normalize_mode(open_upload(upload), fmt)
+
+    max_size = getattr(settings, 'PROFILE_IMAGE_MAX_SIZE', 1024)
+    main.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    renditions = {'original': encode(main, fmt)}
+    for size in AVATAR_SIZES:
+        avatar = ImageOps.fit(main, (size, size), Image.Resampling.LANCZOS)
+        renditions[size] = encode(avatar, fmt)
+    return renditions
+
+
+def rendition_name(upload_name, size=None):
+    # 'IMG 001.JPG' -> 'img-001.webp' / 'img-001_64.webp'
+    stem = slugify(os.path.splitext(os.path.basename(upload_name or ''))[0]) or 'avatar'
+    suffix = f'_{size}' if size else ''
+    return f'{stem}{suffix}.{EXTENSIONS[image_format()]}'
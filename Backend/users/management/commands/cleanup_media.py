@@ -0,0 +1,50 @@
+import posixpath
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import Profile
+
+
+def walk(storage, directory):
+    # Semua nama file di bawah directory (rekursif), format nama storage
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = "Hapus file foto profil yang tidak direferensikan profil mana pun (orphan)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Hanya tampilkan, tanpa menghapus.")
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help="Lewati file yang lebih muda dari N detik (upload yang transaksinya belum commit)."
+        )
+
+    def handle(self, *args, **options):
+        field = Profile._meta.get_field('image')
+        storage = field.storage
+        referenced = Profile.referenced_files() | {field.default}
+        cutoff = time.time() - options['min_age']
+
+        orphans = [
+            name for name in walk(storage, field.upload_to)
+            if name not in referenced and storage.get_modified_time(name).timestamp() <= cutoff
+        ]
+        freed = sum(storage.size(name) for name in orphans)
+        if not options['dry_run']:
+            for name in orphans:
+                storage.delete(name)
+
+        verb = "akan dihapus" if options['dry_run'] else "dihapus"
+        for name in orphans[:20]:
+            self.stdout.write(f"  {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(orphans)} file orphan {verb} ({freed / (1024 * 1024):.1f} MB)."
+        ))
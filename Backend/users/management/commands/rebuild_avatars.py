@@ -0,0 +1,39 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from users.images import process_profile_image
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Proses ulang foto profil lama (sebelum ada pipeline foto): perkecil & buat avatar per ukuran."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Proses semua profil, termasuk yang sudah punya avatar."
+        )
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(image='').exclude(image=Profile._meta.get_field('image').default)
+        if not options['all']:
+            profiles = profiles.filter(avatars={})
+
+        processed = skipped = 0
+        for profile in profiles.iterator():
+            storage = profile.image.storage
+            if not storage.exists(profile.image.name):
+                self.stdout.write(f"Lewati {profile.user_id}: file {profile.image.name} tidak ada.")
+                skipped += 1
+                continue
+            try:
+                with storage.open(profile.image.name) as upload:
+                    renditions = process_profile_image(upload)
+            except ValidationError as exc:
+                self.stdout.write(f"Lewati {profile.user_id}: {' '.join(exc.messages)}")
+                skipped += 1
+                continue
+            profile.set_image(profile.image.name, renditions)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{processed} foto profil diproses, {skipped} dilewati."))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='avatars',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
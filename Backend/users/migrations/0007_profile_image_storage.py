@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 14:56
+
+import users.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_profile_avatars'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(default='default.png', storage=users.storage.ContentAddressedStorage(), upload_to='profile_pics'),
+        ),
+    ]
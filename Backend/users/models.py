@@ -1,8 +1,14 @@
-from django.db import models 
+import time
+
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .images import AVATAR_SIZES, rendition_name
+from .storage import ContentAddressedStorage
+
 # Custom User Model
 class User(AbstractUser):
     # Pilihan Role
@@ -14,6 +20,41 @@ class User(AbstractUser):
     full_name = models.CharField(max_length=255, blank=True, null=True)
     # Default role adalah 'user' agar aman saat register
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
+    # Versi sesi: ikut ditulis di token (claim 'ver'). Token dengan versi lama ditolak.
+    token_version = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nilai awal role/is_active: dibandingkan saat save() untuk mendeteksi perubahan
+        instance._loaded_access = {
+            name: value for name, value in zip(field_names, values) if name in ('role', 'is_active')
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Password baru (set_password), role berubah atau akun dinonaktifkan -> semua token lama dicabut.
+        # Catatan: rehash password otomatis saat login mengosongkan _password sebelum save(),
+        # jadi tidak ikut mencabut sesi.
+        loaded = getattr(self, '_loaded_access', {})
+        revoke = not self._state.adding and (
+            self._password is not None
+            or any(getattr(self, name) != value for name, value in loaded.items())
+        )
+        if revoke:
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_access = {'role': self.role, 'is_active': self.is_active}
+        if revoke:
+            transaction.on_commit(self.forget_cached_state)
+
+    def forget_cached_state(self):
+        # Import lokal: users.authentication meng-import model ini
+        from .authentication import user_states
+        user_states.invalidate(self.pk)
 
     def __str__(self):
         return self.username
@@ -21,7 +62,70 @@ class User(AbstractUser):
 # Model Profile (untuk Foto & Data Tambahan)
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
-    image = models.ImageField(default='default.png', upload_to='profile_pics')
+    # Gambar utama yang sudah diproses (lihat users/images.py), bukan file upload mentah.
+    # Nama file = hash isinya (users/storage.py): upload identik tidak disimpan dua kali.
+    image = models.ImageField(default='default.png', upload_to='profile_pics', storage=ContentAddressedStorage())
+    # Avatar persegi per ukuran: {"64": "profile_pics/<sha256>.webp", "256": ...}
+    avatars = models.JSONField(default=dict, blank=True)
+
+    def set_image(self, upload_name, renditions):
+        # renditions = hasil images.process_profile_image()
+        superseded = self.file_names()
+        renditions = dict(renditions)
+        self.image.save(rendition_name(upload_name), renditions.pop('original'), save=False)
+        upload_to = self.image.field.upload_to
+        self.avatars = {
+            str(size): self.image.storage.save(f'{upload_to}/{rendition_name(upload_name, size)}', content)
+            for size, content in renditions.items()
+        }
+        with transaction.atomic():
+            self.save(update_fields=['image', 'avatars'])
+            # File lama dihapus setelah commit (rollback = file lama masih dipakai)
+            superseded -= self.file_names()
+            transaction.on_commit(lambda: Profile.delete_unreferenced(superseded))
+
+    def file_names(self):
+        # Semua file milik profil ini (gambar utama + avatar), tanpa gambar default
+        names = {self.image.name, *self.avatars.values()}
+        return {name for name in names if name and name != self._meta.get_field('image').default}
+
+    @classmethod
+    def referenced_files(cls):
+        names = set()
+        for image, avatars in cls.objects.values_list('image', 'avatars'):
+            names.add(image)
+            names.update((avatars or {}).values())
+        return names
+
+    @classmethod
+    def delete_unreferenced(cls, names):
+        # Satu file bisa dipakai beberapa profil (dedup): hapus hanya yang tidak dipakai lagi.
+        # File yang baru saja ditulis/dipakai ulang (mtime dalam PROFILE_IMAGE_REUSE_GRACE)
+        # dilewati: bisa jadi milik upload lain yang transaksinya belum commit, jadi
+        # belum terlihat di referenced_files(). Sisanya dibereskan `cleanup_media`.
+        storage = cls._meta.get_field('image').storage
+        cutoff = time.time() - getattr(settings, 'PROFILE_IMAGE_REUSE_GRACE', 300)
+        orphans = set()
+        for name in set(names) - cls.referenced_files():
+            try:
+                if storage.get_modified_time(name).timestamp() > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            storage.delete(name)
+            orphans.add(name)
+        return orphans
+
+    def image_urls(self):
+        # {'original': url, '64': url, '256': url}. Foto lama yang belum diproses
+        # (belum punya avatar) memakai gambar utama untuk semua ukuran.
+        if not self.image:
+            return {}
+        urls = {'original': self.image.url}
+        for size in AVATAR_SIZES:
+            name = self.avatars.get(str(size))
+            urls[str(size)] = self.image.storage.url(name) if name else self.image.url
+        return urls
 
     def __str__(self):
         return self.user.username
@@ -34,4 +138,9 @@ def create_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+@receiver(post_delete, sender=Profile)
+def delete_profile_files(sender, instance, **kwargs):
+    names = instance.file_names()
+    transaction.on_commit(lambda: Profile.delete_unreferenced(names))
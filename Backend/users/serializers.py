@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from .images import process_profile_image
 from .models import User, Profile
+from .throttling import hashing_slot
 
 # --- 1. REGISTER SERIALIZER (SUDAH DIPERBAIKI) ---
 class RegisterSerializer(serializers.ModelSerializer):
@@ -41,32 +43,39 @@ class LoginSerializer(serializers.Serializer):
         password = data.get("password", "")
 
         if username and password:
-            # Cek kredensial ke database
-            user = authenticate(username=username, password=password)
-            
-            if user:
-                if not user.is_active:
-                    raise serializers.ValidationError("Akun ini sedang dinonaktifkan.")
-                return user
-            else:
+            # Cek kredensial lewat backend auth Django (ModelBackend juga menjalankan hasher
+            # sekali untuk username yang tidak dikenal, jadi waktunya sama dengan password
+            # salah). Hashing dibatasi jumlah bersamaannya (lihat users/throttling.py)
+            with hashing_slot():
+                user = authenticate(self.context.get('request'), username=username, password=password)
+
+            if user is None:
                 raise serializers.ValidationError("Username atau Password salah.")
+            if not user.is_active:
+                raise serializers.ValidationError("Akun ini sedang dinonaktifkan.")
+            return user
         else:
             raise serializers.ValidationError("Harus menyertakan username dan password.")
 
 # --- 3. PROFIL SERIALIZER (GET & EDIT INFO) ---
 class UserProfileSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    # URL per ukuran: {'original', '64', '256'}. Header cukup pakai '64'.
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'full_name', 'role', 'image_url']
+        fields = ['id', 'username', 'email', 'full_name', 'role', 'image_url', 'image_urls']
         read_only_fields = ['id', 'role'] # Role tidak bisa diedit user sendiri
 
     def get_image_url(self, obj):
+        return self.get_image_urls(obj).get('original')
+
+    def get_image_urls(self, obj):
         request = self.context.get('request')
-        if hasattr(obj, 'profile') and obj.profile.image and hasattr(obj.profile.image, 'url'):
-            return request.build_absolute_uri(obj.profile.image.url)
-        return None
+        if hasattr(obj, 'profile'):
+            return {size: request.build_absolute_uri(url) for size, url in obj.profile.image_urls().items()}
+        return {}
 
 # --- 4. SERIALIZER GANTI FOTO ---
 class ProfileImageSerializer(serializers.ModelSerializer):
@@ -74,6 +83,15 @@ class ProfileImageSerializer(serializers.ModelSerializer):
         model = Profile
         fields = ['image']
 
+    def validate_image(self, upload):
+        # Diproses saat validasi: file yang ditolak pipeline -> 400 (lihat users/images.py)
+        return {'upload_name': upload.name, 'renditions': process_profile_image(upload)}
+
+    def update(self, instance, validated_data):
+        if 'image' in validated_data:
+            instance.set_image(**validated_data['image'])
+        return instance
+
 # --- 5. SERIALIZER GANTI PASSWORD ---
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
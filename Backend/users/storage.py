@@ -0,0 +1,41 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# --- Storage Berbasis Isi (Content-Addressed) ---
+# Nama file = sha256 isinya, mis. profile_pics/3f2a...c9.webp.
+#   - Upload dengan isi identik -> file yang sama (tidak ditulis ulang, tidak ada _l4YD5II).
+#   - Isi sebuah nama tidak pernah berubah -> aman di-cache browser selamanya (immutable).
+# Karena satu file bisa dipakai beberapa profil, file lama hanya dihapus kalau
+# sudah tidak direferensikan lagi (lihat Profile.delete_unreferenced).
+# Upload yang memakai ulang file yang sudah ada meng-"touch" file tsb (mtime = sekarang):
+# referensinya baru terlihat setelah commit, dan selama itu mtime baru inilah yang
+# menahan penghapusan (PROFILE_IMAGE_REUSE_GRACE / cleanup_media --min-age).
+HASHED_NAME_PATTERN = r'[0-9a-f]{64}\.[a-z0-9]+'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Dua upload identik yang bersamaan menulis byte yang sama ke nama yang sama
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+
+        # Nama asli hanya dipakai untuk folder (upload_to) & ekstensi
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), digest.hexdigest() + extension)
+        try:
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            # Belum ada (atau baru saja dihapus sebagai orphan): tulis
+            return super().save(name, content, max_length=max_length)
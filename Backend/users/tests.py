@@ -1,3 +1,456 @@
-from django.test import TestCase
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from inventory.cache import get_cache
+from .authentication import ClaimsUser, UserStateCache, user_states
+from .images import process_profile_image
+from .models import Profile, User
+from .throttling import LoginIPThrottle, hashing_slot
+from .views import serve_immutable_media
+
+
+class AuthAPITestCase(APITestCase):
+    def setUp(self):
+        # Cache status user & cache respons per proses: mulai dari nol tiap test
+        user_states.invalidate()
+        get_cache().clear()
+        caches[settings.LOGIN_THROTTLE_CACHE].clear()
+        self.user = User.objects.create_user(username='gudang', password='rahasia123', role='admin')
+
+    def login(self, username='gudang', password='rahasia123'):
+        return self.client.post('/api/users/login/', {'username': username, 'password': password})
+
+    def use_token(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+# --- Autentikasi JWT Cepat ---
+class StatelessAuthTests(AuthAPITestCase):
+    def test_login_embeds_role_and_version_claims(self):
+        access = AccessToken(self.login().data['access'])
+        self.assertEqual((access['role'], access['ver']), ('admin', 0))
+
+    def test_read_requests_skip_user_lookup(self):
+        self.use_token(self.login().data['access'])
+        self.client.get('/api/dashboard/')
+        # Status user & respons dashboard sudah di-cache: tidak ada query sama sekali
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, ClaimsUser)
+        self.assertEqual((response.wsgi_request.user.id, response.wsgi_request.user.role), (self.user.pk, 'admin'))
+
+    def test_write_requests_load_full_user(self):
+        self.use_token(self.login().data['access'])
+        response = self.client.post('/api/categories/', {'name': 'Bahan'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(response.wsgi_request.user, User)
+
+    @override_settings(AUTH_USER_STATE_TTL=0)
+    def test_deactivated_or_role_changed_user_is_rejected(self):
+        self.use_token(self.login().data['access'])
+        self.assertEqual(self.client.get('/api/categories/').status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(role='user')
+        self.assertEqual(self.client.get('/api/categories/').status_code, 401)
+
+        User.objects.filter(pk=self.user.pk).update(role='admin', is_active=False)
+        self.assertEqual(self.client.get('/api/categories/').status_code, 401)
+
+    def test_tokens_without_claims_fall_back_to_database(self):
+        self.use_token(AccessToken.for_user(self.user))
+        # SELECT user + SELECT kategori
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/categories/').status_code, 200)
+
+
+# --- Pencabutan Token ---
+class TokenRevocationTests(AuthAPITestCase):
+    def test_password_change_revokes_old_tokens(self):
+        tokens = self.login().data
+        self.use_token(tokens['access'])
+        self.client.get('/api/categories/')  # status user masuk cache
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/users/profile/change-password/', {
+                'old_password': 'rahasia123', 'new_password': 'baru456', 'confirm_password': 'baru456',
+            })
+        self.assertEqual(response.status_code, 200)
+
+        # Cache lokal sudah di-invalidate: token lama langsung ditolak (juga di endpoint non-inventory)
+        self.assertEqual(self.client.get('/api/categories/').status_code, 401)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+        self.client.credentials()
+        refresh = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(refresh.status_code, 401)
+
+        # Token baru dari respons ganti password tetap berlaku
+        self.use_token(response.data['access'])
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+    def test_role_change_and_deactivation_bump_version(self):
+        self.user.role = 'user'
+        self.user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 2)
+
+    def test_unrelated_saves_keep_sessions(self):
+        access = self.login().data['access']  # login = update last_login
+        user = User.objects.get(pk=self.user.pk)
+        user.full_name = 'Kepala Gudang'
+        user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 0)
+        self.use_token(access)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+    def test_admin_role_change_revokes_managed_user(self):
+        staff = User.objects.create_user(username='staf', password='rahasia123')
+        staff_access = self.login('staf').data['access']
+        self.use_token(self.login().data['access'])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/users/manage/{staff.pk}/', {'role': 'admin'})
+        self.assertEqual(response.status_code, 200)
+
+        self.use_token(staff_access)
+        self.assertEqual(self.client.get('/api/categories/').status_code, 401)
+
+    def test_refresh_keeps_working_while_version_matches(self):
+        refresh = self.client.post('/api/users/token/refresh/', {'refresh': self.login().data['refresh']})
+        self.assertEqual(refresh.status_code, 200)
+        self.use_token(refresh.data['access'])
+        self.assertEqual(self.client.get('/api/categories/').status_code, 200)
+
+    @override_settings(AUTH_USER_STATE_CACHE_SIZE=2)
+    def test_state_cache_is_bounded_lru(self):
+        cache = UserStateCache()
+        others = [User.objects.create_user(username=f'u{i}', password='x') for i in range(2)]
+        cache.get(self.user.pk)
+        cache.get(others[0].pk)
+        cache.get(self.user.pk)  # paling baru dipakai
+        cache.get(others[1].pk)  # others[0] dibuang
+        self.assertEqual(len(cache), 2)
+        with self.assertNumQueries(0):
+            cache.get(self.user.pk)
+        with self.assertNumQueries(1):
+            cache.get(others[0].pk)
+
+
+# --- Pembatasan Login ---
+class LoginThrottleTests(AuthAPITestCase):
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (100, 1), 'username': (2, 60)})
+    def test_username_bucket_rejects_before_hashing(self):
+        self.assertEqual(self.login(password='salah').status_code, 400)
+        self.assertEqual(self.login(password='salah').status_code, 400)
+        with mock.patch('django.contrib.auth.base_user.make_password') as hasher, \
+                mock.patch.object(User, 'check_password') as check:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        hasher.assert_not_called()
+        check.assert_not_called()
+        # Username lain tidak ikut terkunci
+        self.assertEqual(self.login(username='GUDANG2').status_code, 400)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (100, 1), 'username': (1, 60)})
+    def test_non_object_body_is_rejected_not_crashed(self):
+        response = self.client.post('/api/users/login/', ['gudang', 'rahasia123'], format='json')
+        self.assertEqual(response.status_code, 400)
+        # Body bukan object -> bucket "username" per IP (kapasitas 1), sudah terpakai
+        response = self.client.post('/api/users/login/', 'gudang', format='json')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (1, 60), 'username': (100, 1)})
+    def test_ip_bucket(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login(username='lain').status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (1, 60), 'username': (100, 1)})
+    def test_spoofed_forwarded_for_does_not_reset_ip_bucket(self):
+        # Tanpa proxy (NUM_PROXIES=0) IP = REMOTE_ADDR; X-Forwarded-For klien diabaikan
+        self.assertEqual(self.login().status_code, 200)
+        self.client.credentials(HTTP_X_FORWARDED_FOR='10.9.8.7')
+        self.assertEqual(self.login(username='lain').status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (1, 60), 'username': (100, 1)})
+    def test_trusted_proxy_entry_is_used(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            # Entri terakhir = yang ditambahkan proxy kita; entri depan bisa dipalsukan klien
+            self.client.credentials(HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.1')
+            self.assertEqual(self.login().status_code, 200)
+            self.client.credentials(HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.1')
+            self.assertEqual(self.login().status_code, 429)
+            self.client.credentials(HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.2')
+            self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (5, 60), 'username': (100, 1)})
+    def test_concurrent_attempts_share_one_bucket(self):
+        request = RequestFactory().post('/api/users/login/', REMOTE_ADDR='10.1.1.1')
+        start = threading.Barrier(20)
+        allowed = []
+        # caches[...] membuat objek cache per thread: patch di level class
+        backend = type(caches[settings.LOGIN_THROTTLE_CACHE])
+        cache_get = backend.get
+
+        def slow_get(cache, *args, **kwargs):
+            # Perlebar jeda baca -> tulis supaya race pasti terlihat tanpa mutex
+            value = cache_get(cache, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        def attempt():
+            start.wait()
+            allowed.append(LoginIPThrottle().allow_request(request, None))
+
+        with mock.patch.object(backend, 'get', slow_get):
+            threads = [threading.Thread(target=attempt) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(allowed.count(True), 5)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (100, 1), 'username': (1, 60)})
+    def test_buckets_live_in_their_own_cache(self):
+        self.login(password='salah')
+        # Cache inventory dibersihkan / penuh -> bucket login tidak ikut hilang
+        get_cache().clear()
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_unknown_username_still_runs_hasher(self):
+        with mock.patch('django.contrib.auth.base_user.make_password') as hasher:
+            response = self.login(username='tidakada')
+        self.assertEqual(response.status_code, 400)
+        hasher.assert_called_once_with('rahasia123')
+
+    def test_login_goes_through_auth_backends(self):
+        failed = []
+        handler = lambda sender, credentials, request, **kwargs: failed.append(request)
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.assertEqual(self.login(password='salah').status_code, 400)
+        self.assertEqual(len(failed), 1)
+        self.assertIsNotNone(failed[0])
+
+    def test_reports_login_cpu_time(self):
+        response = self.login()
+        self.assertRegex(response['Server-Timing'], r'^login;desc="cpu";dur=\d+\.\d$')
+
+    @override_settings(LOGIN_MAX_CONCURRENT=1, LOGIN_QUEUE_TIMEOUT=0)
+    def test_concurrent_hashing_is_capped(self):
+        with hashing_slot():
+            self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_hasher_cost_is_configurable_and_rehashes_on_login(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.assertEqual(self.login().status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        # Rehash otomatis bukan ganti password: sesi tidak dicabut
+        self.assertEqual(user.token_version, 0)
+
+
+# --- Foto Profil ---
+def make_photo(size=(1200, 600), orientation=None, fmt='JPEG', name='Foto Kamera.JPG'):
+    image = Image.new('RGB', size, 'red')
+    # Setengah kiri biru: arah rotasi bisa dicek dari warna piksel
+    image.paste('blue', (0, 0, size[0] // 2, size[1]))
+    exif = Image.Exif()
+    exif[0x010F] = 'KameraX'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, fmt, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProfileImageTests(AuthAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.use_token(self.login().data['access'])
+
+    def upload(self, photo):
+        return self.client.put('/api/users/profile/upload-image/', {'image': photo}, format='multipart')
+
+    def open_url(self, url):
+        profile = User.objects.get(pk=self.user.pk).profile
+        name = url.split('/media/', 1)[1]
+        return Image.open(profile.image.storage.open(name))
+
+    def test_upload_is_oriented_stripped_downscaled_with_avatars(self):
+        # Orientation 6 = diputar 90° searah jarum jam saat ditampilkan
+        response = self.upload(make_photo(size=(2400, 1200), orientation=6))
+        self.assertEqual(response.status_code, 200)
+        urls = response.data['image_urls']
+        self.assertEqual(set(urls), {'original', '64', '256'})
+        self.assertEqual(response.data['image_url'], urls['original'])
+
+        main = self.open_url(urls['original'])
+        self.assertEqual((main.format, main.size), ('WEBP', (512, 1024)))
+        self.assertEqual(len(main.getexif()), 0)
+        self.assertNotIn('exif', main.info)
+        # Setelah rotasi, bagian biru (kiri) pindah ke atas
+        self.assertEqual(main.convert('RGB').getpixel((256, 10)), (0, 0, 255))
+
+        for size in ('64', '256'):
+            avatar = self.open_url(urls[size])
+            self.assertEqual((avatar.format, avatar.size), ('WEBP', (int(size), int(size))))
+        self.assertRegex(urls['64'], r'/media/profile_pics/[0-9a-f]{64}\.webp$')
+
+        me = self.client.get('/api/users/me/').data
+        self.assertEqual(me['image_urls'], urls)
+
+    @override_settings(PROFILE_IMAGE_FORMAT='JPEG')
+    def test_jpeg_output(self):
+        urls = self.upload(make_photo()).data['image_urls']
+        self.assertEqual(self.open_url(urls['64']).format, 'JPEG')
+        self.assertNotIn('exif', self.open_url(urls['original']).info)
+
+    @override_settings(PROFILE_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_rejects_oversized_upload(self):
+        response = self.upload(make_photo())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    @override_settings(PROFILE_IMAGE_MAX_PIXELS=1000)
+    def test_rejects_huge_resolution(self):
+        self.assertEqual(self.upload(make_photo(size=(100, 100))).status_code, 400)
+
+    def test_rejects_decompression_bomb_header(self):
+        # PNG ±100 byte yang header-nya mengaku 20000x20000 piksel (di atas 2x batas Pillow)
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+        header = struct.pack('>IIBBBBB', 20000, 20000, 8, 2, 0, 0, 0)
+        png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(b'')) + chunk(b'IEND', b'')
+        with override_settings(PROFILE_IMAGE_MAX_PIXELS=10 ** 9):
+            response = self.upload(SimpleUploadedFile('bom.png', png, content_type='image/png'))
+            self.assertEqual(response.status_code, 400)
+            # Jalur tanpa validasi DRF (mis. rebuild_avatars) juga ditolak dengan rapi
+            with self.assertRaisesMessage(ValidationError, "Resolusi foto terlalu besar."):
+                process_profile_image(SimpleUploadedFile('bom.png', png))
+
+    def test_legacy_image_falls_back_and_can_be_rebuilt(self):
+        profile = User.objects.get(pk=self.user.pk).profile
+        profile.image.save('Lama.JPG', make_photo(size=(3000, 2000)))
+        urls = self.client.get('/api/users/me/').data['image_urls']
+        self.assertEqual(urls['64'], urls['original'])
+
+        out = StringIO()
+        call_command('rebuild_avatars', stdout=out)
+        self.assertIn('1 foto profil diproses', out.getvalue())
+        urls = self.client.get('/api/users/me/').data['image_urls']
+        self.assertEqual(self.open_url(urls['64']).size, (64, 64))
+        self.assertEqual(self.open_url(urls['original']).size, (1024, 683))
+
+
+# --- Storage Foto Berbasis Hash ---
+class ContentAddressedMediaTests(AuthAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        # Tanpa masa tenggang: file yang diganti langsung dihapus kalau tidak dipakai lagi
+        media = override_settings(MEDIA_ROOT=self.media_root, PROFILE_IMAGE_REUSE_GRACE=0)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def stored_files(self):
+        folder = os.path.join(self.media_root, 'profile_pics')
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def upload_as(self, user, photo):
+        self.use_token(self.login(user.username).data['access'])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/users/profile/upload-image/', {'image': photo}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return Profile.objects.get(user=user)
+
+    def test_identical_uploads_are_stored_once(self):
+        other = User.objects.create_user(username='staf', password='rahasia123')
+        first = self.upload_as(self.user, make_photo(name='a.jpg'))
+        second = self.upload_as(other, make_photo(name='b.jpg'))
+        self.assertEqual(first.file_names(), second.file_names())
+        self.assertEqual(len(self.stored_files()), 3)  # utama + 64 + 256
+
+        # Ganti foto: file lama masih dipakai 'staf' -> tidak dihapus
+        self.upload_as(self.user, make_photo(size=(800, 800)))
+        self.assertEqual(len(self.stored_files()), 6)
+
+        # Foto 'staf' ikut diganti -> file lama tidak dipakai siapa pun -> dihapus
+        self.upload_as(other, make_photo(size=(800, 800)))
+        self.assertEqual(len(self.stored_files()), 3)
+
+    @override_settings(PROFILE_IMAGE_REUSE_GRACE=300)
+    def test_file_reused_by_uncommitted_upload_is_kept(self):
+        profile = self.upload_as(self.user, make_photo())
+        names = profile.file_names()
+        storage = profile.image.storage
+        two_days_ago = time.time() - 2 * 86400
+        for name in names:
+            os.utime(storage.path(name), (two_days_ago, two_days_ago))
+
+        # Foto diganti (file lama tidak direferensikan lagi) sementara upload identik
+        # lain memakai ulang gambar utamanya tapi belum commit
+        Profile.objects.filter(pk=profile.pk).update(image=Profile._meta.get_field('image').default, avatars={})
+        with storage.open(profile.image.name) as content:
+            self.assertEqual(storage.save('profile_pics/lain.webp', content), profile.image.name)
+
+        deleted = Profile.delete_unreferenced(names)
+        self.assertEqual(deleted, names - {profile.image.name})
+        self.assertTrue(storage.exists(profile.image.name))
+
+    def test_deleting_user_deletes_its_files(self):
+        self.upload_as(self.user, make_photo())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.stored_files(), [])
+
+    def test_cleanup_media_deletes_orphans(self):
+        profile = self.upload_as(self.user, make_photo())
+        kept = self.stored_files()
+        profile.image.storage.save('profile_pics/lama.jpg', make_photo())
+        orphan = profile.image.storage.save('profile_pics/2024/x.jpg', make_photo(size=(50, 50)))
+
+        out = StringIO()
+        call_command('cleanup_media', '--dry-run', '--min-age=0', stdout=out)
+        self.assertIn('2 file orphan akan dihapus', out.getvalue())
+        self.assertEqual(len(self.stored_files()), 5)
+
+        # File baru (di bawah --min-age) dilewati
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertEqual(len(self.stored_files()), 5)
+
+        call_command('cleanup_media', '--min-age=0', stdout=StringIO())
+        self.assertEqual(self.stored_files(), sorted(kept + ['2024']))
+        self.assertFalse(profile.image.storage.exists(orphan))
+
+    def test_hashed_media_is_served_immutable(self):
+        profile = self.upload_as(self.user, make_photo())
+        response = serve_immutable_media(RequestFactory().get('/'), profile.avatars['64'])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
@@ -0,0 +1,122 @@
+import hashlib
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+# --- Pembatasan Login (Token Bucket) ---
+# Setiap percobaan login mengambil 1 token dari bucket per-IP dan per-username.
+# Bucket terisi ulang 1 token tiap `interval` detik sampai maksimal `capacity`
+# (LOGIN_THROTTLE_RATES). Bucket kosong -> 429 + Retry-After, TANPA menjalankan hasher,
+# jadi serbuan login gagal tidak menghabiskan CPU worker yang melayani inventory.
+# State bucket disimpan di cache LOGIN_THROTTLE_CACHE (Redis di produksi = lintas proses).
+# Baca-ubah-tulis bucket dijaga mutex per bucket (cache.add = atomik), supaya percobaan
+# bersamaan tidak membaca jumlah token yang sama.
+LOCK_TIMEOUT = 2  # detik; mutex yang tertinggal (proses mati) kedaluwarsa sendiri
+LOCK_ATTEMPTS = 100
+LOCK_RETRY_DELAY = 0.005
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'LOGIN_THROTTLE_CACHE', 'default')]
+
+    def get_bucket_ident(self, request):
+        # None = request ini tidak dibatasi oleh bucket ini
+        raise NotImplementedError
+
+    def get_rate(self):
+        # (capacity, interval detik per token)
+        return settings.LOGIN_THROTTLE_RATES[self.scope]
+
+    def allow_request(self, request, view):
+        ident = self.get_bucket_ident(request)
+        if ident is None:
+            return True
+
+        capacity, interval = self.get_rate()
+        key = f"throttle:{self.scope}:{hashlib.sha256(ident.encode()).hexdigest()}"
+        if not self.acquire(f'{key}:lock'):
+            # Bucket ini sedang diserbu percobaan bersamaan: tolak saja
+            self.wait_seconds = interval
+            return False
+        try:
+            now = time.time()
+            tokens, updated = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) / interval)
+            if tokens < 1:
+                self.wait_seconds = (1 - tokens) * interval
+                return False
+
+            # Entry boleh hilang setelah bucket pasti terisi penuh lagi
+            self.cache.set(key, (tokens - 1, now), math.ceil(capacity * interval))
+            return True
+        finally:
+            self.cache.delete(f'{key}:lock')
+
+    def acquire(self, lock_key):
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock_key, 1, LOCK_TIMEOUT):
+                return True
+            time.sleep(LOCK_RETRY_DELAY)
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    # IP klien = REMOTE_ADDR, atau entri X-Forwarded-For dari proxy kita sendiri kalau
+    # REST_FRAMEWORK['NUM_PROXIES'] di-set. X-Forwarded-For kiriman klien diabaikan.
+    scope = 'ip'
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    # Menahan tebak-password ke satu akun dari banyak IP
+    scope = 'username'
+
+    def get_bucket_ident(self, request):
+        data = request.data
+        if not isinstance(data, dict):
+            # Body JSON berupa list/angka (bukan object): tidak ada username, pakai IP.
+            # Prefix 'ip:' supaya tidak bentrok dengan username yang kebetulan mirip IP.
+            return f'ip:{self.get_ident(request)}'
+        username = data.get('username')
+        return username.lower() if isinstance(username, str) and username else None
+
+
+# --- Batas Hashing Bersamaan ---
+# Maksimal LOGIN_MAX_CONCURRENT hash password berjalan bersamaan per proses.
+# Request login lain menunggu sebentar (LOGIN_QUEUE_TIMEOUT), lalu ditolak 429.
+_hash_slots = {}
+_hash_slots_lock = threading.Lock()
+
+
+def _get_slots():
+    limit = getattr(settings, 'LOGIN_MAX_CONCURRENT', 2)
+    with _hash_slots_lock:
+        if limit not in _hash_slots:
+            _hash_slots[limit] = threading.BoundedSemaphore(limit)
+        return _hash_slots[limit]
+
+
+@contextmanager
+def hashing_slot():
+    slots = _get_slots()
+    if not slots.acquire(timeout=getattr(settings, 'LOGIN_QUEUE_TIMEOUT', 2)):
+        raise Throttled(wait=1, detail="Terlalu banyak percobaan login, coba lagi sebentar.")
+    try:
+        yield
+    finally:
+        slots.release()
@@ -1,13 +1,19 @@
+import time
+
+from django.conf import settings
+from django.views.static import serve
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import issue_tokens
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 from .models import User, Profile
 from .serializers import (
     RegisterSerializer, LoginSerializer, 
     UserProfileSerializer, ChangePasswordSerializer, ProfileImageSerializer, UserManagementSerializer
 )
-from rest_framework import viewsets
+from rest_framework import viewsets, filters
+from backend.pagination import OptionalCursorPagination
 
 class IsAdminRole(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -23,12 +29,22 @@ class RegisterView(generics.CreateAPIView):
 class LoginView(APIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = LoginSerializer
+    # Token bucket per-IP & per-username: percobaan berlebih ditolak 429 sebelum hashing
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request):
-        serializer = self.serializer_class(data=request.data)
+        started = time.thread_time()
+        response = self.login(request)
+        # Waktu CPU verifikasi login (ms) di header Server-Timing: terlihat di DevTools / log proxy
+        response['Server-Timing'] = f'login;desc="cpu";dur={(time.thread_time() - started) * 1000:.1f}'
+        return response
+
+    def login(self, request):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
         if serializer.is_valid():
             user = serializer.validated_data
-            refresh = RefreshToken.for_user(user)
+            # Token membawa claim role & token_version (lihat users/authentication.py)
+            refresh = issue_tokens(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -82,8 +98,15 @@ class ChangePasswordView(generics.UpdateAPIView):
                 return Response({"old_password": ["Password lama salah."]}, status=status.HTTP_400_BAD_REQUEST)
             
             user.set_password(serializer.data.get("new_password"))
+            # save() menaikkan token_version: semua sesi lama (termasuk token ini) dicabut,
+            # jadi kirim token baru supaya perangkat ini tetap login
             user.save()
-            return Response({"message": "Password berhasil diubah."}, status=status.HTTP_200_OK)
+            refresh = issue_tokens(user)
+            return Response({
+                "message": "Password berhasil diubah.",
+                "refresh": str(refresh),
+                "access": str(refresh.access_token),
+            }, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -102,8 +125,8 @@ class UpdateProfileImageView(generics.UpdateAPIView):
         
         if serializer.is_valid():
             serializer.save()
-            new_image_url = request.build_absolute_uri(instance.image.url)
-            return Response({"image_url": new_image_url}, status=status.HTTP_200_OK)
+            image_urls = {size: request.build_absolute_uri(url) for size, url in instance.image_urls().items()}
+            return Response({"image_url": image_urls['original'], "image_urls": image_urls}, status=status.HTTP_200_OK)
             
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -111,4 +134,19 @@ class UpdateProfileImageView(generics.UpdateAPIView):
 class UserManagementViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = UserManagementSerializer
-    permission_classes = [IsAdminRole] # Hanya Role Admin yang bisa akses
\ No newline at end of file
+    permission_classes = [IsAdminRole] # Hanya Role Admin yang bisa akses
+
+    # Paging & pencarian: ?page_size=&cursor=&search=&ordering=
+    pagination_class = OptionalCursorPagination
+    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    search_fields = ['username', 'full_name', 'email']
+    ordering_fields = ['date_joined', 'username', 'id']
+    ordering = ('-date_joined', 'id')
+
+# --- 7. MEDIA BERBASIS HASH (CACHE PERMANEN) ---
+# Isi file bernama hash tidak pernah berubah: browser boleh menyimpannya selamanya
+# tanpa revalidasi. Foto baru = nama baru = URL baru.
+def serve_immutable_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
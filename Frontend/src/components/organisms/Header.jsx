@@ -12,8 +12,10 @@ const Header = ({ toggleSidebar }) => {
   const username = user?.username || 'Pengguna';
   
   // Gunakan foto dari database, atau avatar default jika null/loading
-  const profileImg = user?.image_url 
-    ? `${user.image_url}` 
+  // Avatar 64 px (beberapa KB), bukan foto ukuran penuh
+  const avatarUrl = user?.image_urls?.['64'] || user?.image_url;
+  const profileImg = avatarUrl 
+    ? `${avatarUrl}` 
     : `https://ui-avatars.com/api/?name=${username}&background=random&color=fff`;
 
   return (
@@ -0,0 +1,53 @@
+import { useState, useEffect } from 'react';
+import api from '../api';
+
+// --- Paging dari Server (Cursor) ---
+// Endpoint list (products, transactions-in/out) memakai OptionalCursorPagination:
+// dengan ?page_size= server hanya mengirim satu halaman + link `next`/`previous`,
+// bukan seluruh tabel. Cursor halaman yang sudah dibuka disimpan di stack supaya
+// tombol Previous cukup mundur satu langkah. Filter/pencarian/jumlah per halaman
+// berubah -> otomatis kembali ke halaman 1.
+const cursorFrom = (link) => (link ? new URL(link).searchParams.get('cursor') : null);
+
+const useCursorPage = (url, { pageSize = 10, params = {} } = {}) => {
+    const filterKey = JSON.stringify([url, pageSize, params]);
+    const [stack, setStack] = useState({ key: filterKey, cursors: [null] });
+    const [rows, setRows] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loading, setLoading] = useState(true);
+    const [reloadCount, setReloadCount] = useState(0);
+
+    const cursors = stack.key === filterKey ? stack.cursors : [null];
+    const cursor = cursors[cursors.length - 1];
+
+    useEffect(() => {
+        let ignore = false; // respons lama (mis. ketikan search sebelumnya) dibuang
+        setLoading(true);
+        api.get(url, { params: { ...params, page_size: pageSize, ...(cursor ? { cursor } : {}) } })
+            .then((response) => {
+                if (ignore) return;
+                setRows(response.data.results);
+                setNextCursor(cursorFrom(response.data.next));
+            })
+            .catch((error) => console.error("Gagal ambil data:", error))
+            .finally(() => { if (!ignore) setLoading(false); });
+        return () => { ignore = true; };
+        // params sudah terwakili filterKey
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [filterKey, cursor, reloadCount]);
+
+    return {
+        rows,
+        loading,
+        page: cursors.length,
+        startIndex: (cursors.length - 1) * pageSize,
+        hasNext: Boolean(nextCursor),
+        hasPrevious: cursors.length > 1,
+        next: () => nextCursor && setStack({ key: filterKey, cursors: [...cursors, nextCursor] }),
+        previous: () => cursors.length > 1 && setStack({ key: filterKey, cursors: cursors.slice(0, -1) }),
+        // Muat ulang halaman yang sedang dibuka (setelah tambah/edit/hapus)
+        reload: () => setReloadCount((count) => count + 1),
+    };
+};
+
+export default useCursorPage;
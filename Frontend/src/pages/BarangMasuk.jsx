@@ -4,18 +4,16 @@ import Modal from '../components/organisms/Modal'; // Kita override di bawah
 import Input from '../components/atoms/Input';
 import { Plus, Printer, Edit, Trash2, Save, X, CheckCircle, Truck } from 'lucide-react';
 import api from '../api';
+import useCursorPage from '../hooks/useCursorPage';
 import jsPDF from 'jspdf';
 import autoTable from 'jspdf-autotable';
 
 const BarangMasuk = () => {
   // --- STATE ---
-  const [transactions, setTransactions] = useState([]);
   const [products, setProducts] = useState([]); 
-  const [loading, setLoading] = useState(true);
 
   // Pagination & Search
   const [itemsPerPage, setItemsPerPage] = useState(10);
-  const [currentPage, setCurrentPage] = useState(1);
   const [searchTerm, setSearchTerm] = useState('');
 
   // Modal State
@@ -44,32 +42,27 @@ const BarangMasuk = () => {
   const [bulanSelected, setBulanSelected] = useState(""); 
 
   // --- 1. GET DATA ---
-  const fetchData = async () => {
+  // Transaksi diambil per halaman dari server (search nama barang juga di server).
+  // Daftar produk tetap diambil utuh untuk pilihan barang di form.
+  const transactionPage = useCursorPage('/transactions-in/', { pageSize: itemsPerPage, params: { search: searchTerm } });
+  const { rows: currentData, loading, startIndex } = transactionPage;
+
+  const fetchProducts = async () => {
       try {
-          const [resTrans, resProd] = await Promise.all([
-              api.get('/transactions-in/'),
-              api.get('/products/')
-          ]);
-          setTransactions(resTrans.data);
+          const resProd = await api.get('/products/');
           setProducts(resProd.data);
       } catch (error) {
           console.error("Gagal ambil data:", error);
-      } finally {
-          setLoading(false);
       }
   };
 
-  useEffect(() => { fetchData(); }, []);
+  useEffect(() => { fetchProducts(); }, []);
 
-  // --- 2. FILTER & PAGINATION ---
-  const filteredData = transactions.filter(item => 
-      item.product_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      item.date.includes(searchTerm)
-  );
-  
-  const totalPages = Math.ceil(filteredData.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const currentData = filteredData.slice(startIndex, startIndex + itemsPerPage);
+  // Setelah tambah/edit/hapus: halaman yang dibuka & stok di pilihan barang dimuat ulang
+  const fetchData = () => {
+      transactionPage.reload();
+      fetchProducts();
+  };
 
   const handleChange = (e) => {
       setFormData({ ...formData, [e.target.name]: e.target.value });
@@ -126,12 +119,21 @@ const BarangMasuk = () => {
   };
 
   // --- LOGIKA CETAK PDF ---
-  const handleProcessCetak = () => {
+  const handleProcessCetak = async () => {
       if (!bulanSelected) {
           alert("Silakan pilih bulan terlebih dahulu!");
           return;
       }
-      const dataToPrint = transactions.filter(item => item.date.split('-')[1] === bulanSelected);
+      // Satu bulan (tahun berjalan) diambil dari server lewat filter tanggal
+      const year = new Date().getFullYear();
+      const lastDay = new Date(year, Number(bulanSelected), 0).getDate();
+      let dataToPrint;
+      try {
+          const response = await api.get('/transactions-in/', {
+              params: { start: `${year}-${bulanSelected}-01`, end: `${year}-${bulanSelected}-${lastDay}` }
+          });
+          dataToPrint = response.data;
+      } catch (error) { alert("Gagal mengambil data."); return; }
       if (dataToPrint.length === 0) { alert(`Tidak ada transaksi pada bulan ini.`); return; }
 
       try {
@@ -154,8 +156,6 @@ const BarangMasuk = () => {
   const openModalHapus = (id) => { setCurrentId(id); setShowModalHapus(true); };
   const closeModal = () => { setShowModalForm(false); setShowModalHapus(false); setShowModalCetak(false); setShowConfirmModal(false); };
 
-  useEffect(() => { setCurrentPage(1); }, [searchTerm, itemsPerPage]);
-
   return (
     <DashboardLayout>
         <h2 className="text-2xl font-bold text-black mb-6">Barang Masuk</h2>
@@ -243,11 +243,11 @@ const BarangMasuk = () => {
             
             {/* Pagination Footer */}
             <div className="flex flex-col md:flex-row justify-between items-center mt-4 pt-4 border-t border-gray-200 text-sm text-gray-600">
-                <div>Showing {currentData.length === 0 ? 0 : startIndex + 1} to {Math.min(startIndex + itemsPerPage, filteredData.length)} of {filteredData.length} entries</div>
+                <div>Showing {currentData.length === 0 ? 0 : startIndex + 1} to {startIndex + currentData.length} entries</div>
                 <div className="flex border border-gray-300 rounded overflow-hidden">
-                    <button onClick={() => setCurrentPage(Math.max(1, currentPage - 1))} disabled={currentPage === 1} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 border-r border-gray-300 disabled:opacity-50">Previous</button>
-                    <button className="px-3 py-1 bg-[#0d6efd] text-white border-r border-gray-300">{currentPage}</button>
-                    <button onClick={() => setCurrentPage(Math.min(totalPages, currentPage + 1))} disabled={currentPage === totalPages || totalPages === 0} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 disabled:opacity-50">Next</button>
+                    <button onClick={transactionPage.previous} disabled={!transactionPage.hasPrevious} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 border-r border-gray-300 disabled:opacity-50">Previous</button>
+                    <button className="px-3 py-1 bg-[#0d6efd] text-white border-r border-gray-300">{transactionPage.page}</button>
+                    <button onClick={transactionPage.next} disabled={!transactionPage.hasNext} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 disabled:opacity-50">Next</button>
                 </div>
             </div>
         </div>
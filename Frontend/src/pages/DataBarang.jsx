@@ -4,17 +4,15 @@ import Modal from '../components/organisms/Modal';
 import Input from '../components/atoms/Input';
 import { Plus, Edit, Trash2, Save, X, Search, CheckCircle, AlertTriangle } from 'lucide-react';
 import api from '../api';
+import useCursorPage from '../hooks/useCursorPage';
 import { useLocation, useNavigate } from 'react-router-dom';
 
 const DataBarang = () => {
   // --- STATE MANAGEMENT ---
-  const [products, setProducts] = useState([]);
   const [categories, setCategories] = useState([]);
-  const [loading, setLoading] = useState(true);
   
   // State Pagination & Search
   const [itemsPerPage, setItemsPerPage] = useState(10);
-  const [currentPage, setCurrentPage] = useState(1);
   const [searchTerm, setSearchTerm] = useState('');
 
   // State Modals Input/Hapus
@@ -53,38 +51,23 @@ const DataBarang = () => {
   }, [location.state]);
 
   // --- 2. GET DATA ---
-  const fetchData = async () => {
+  // Produk diambil per halaman dari server (search nama/kategori juga di server)
+  const productPage = useCursorPage('/products/', { pageSize: itemsPerPage, params: { search: searchTerm } });
+  const { rows: currentData, loading, startIndex } = productPage;
+
+  const fetchCategories = async () => {
       try {
-          const [resProducts, resCategories] = await Promise.all([
-              api.get('/products/'),
-              api.get('/categories/')
-          ]);
-          setProducts(resProducts.data);
+          const resCategories = await api.get('/categories/');
           setCategories(resCategories.data);
       } catch (error) {
           console.error("Gagal ambil data:", error);
-      } finally {
-          setLoading(false);
       }
   };
 
   useEffect(() => {
-      fetchData();
+      fetchCategories();
   }, []);
 
-  // --- 3. FILTER & PAGINATION ---
-  const filteredProducts = products.filter((item) => {
-      if (!searchTerm) return true;
-      return (
-          item.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          item.category_name?.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-  });
-
-  const totalPages = Math.ceil(filteredProducts.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const currentData = filteredProducts.slice(startIndex, startIndex + itemsPerPage);
-
   const handleChange = (e) => {
       setFormData({ ...formData, [e.target.name]: e.target.value });
   };
@@ -113,12 +96,12 @@ const DataBarang = () => {
       try {
           if (isEdit) {
               await api.put(`/products/${currentId}/`, dataToSend);
-              fetchData();
+              productPage.reload();
               setShowConfirmModal(false);
               triggerToast("Data berhasil diperbarui!"); // TOAST EDIT
           } else {
               await api.post('/products/', dataToSend);
-              fetchData();
+              productPage.reload();
               setShowConfirmModal(false); 
               setShowNavigateModal(true); // Khusus Add, tampilkan tawaran navigasi
           }
@@ -138,7 +121,7 @@ const DataBarang = () => {
   const handleHapus = async () => {
       try {
           await api.delete(`/products/${currentId}/`);
-          fetchData();
+          productPage.reload();
           setShowModalHapus(false);
           triggerToast("Data berhasil dihapus!"); // TOAST HAPUS
       } catch (error) {
@@ -183,8 +166,6 @@ const DataBarang = () => {
       return cat ? cat.name : '-'; 
   };
 
-  useEffect(() => { setCurrentPage(1); }, [searchTerm, itemsPerPage]);
-
   return (
     <DashboardLayout>
         <h2 className="text-2xl font-bold text-black mb-6">Data Barang</h2>
@@ -278,11 +259,11 @@ const DataBarang = () => {
             </div>
             
             <div className="flex flex-col md:flex-row justify-between items-center mt-4 pt-4 border-t border-gray-200 text-sm text-gray-600">
-                <div>Showing {currentData.length === 0 ? 0 : startIndex + 1} to {Math.min(startIndex + itemsPerPage, filteredProducts.length)} of {filteredProducts.length} entries</div>
+                <div>Showing {currentData.length === 0 ? 0 : startIndex + 1} to {startIndex + currentData.length} entries</div>
                 <div className="flex border border-gray-300 rounded overflow-hidden">
-                    <button onClick={() => setCurrentPage(Math.max(1, currentPage - 1))} disabled={currentPage === 1} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 border-r border-gray-300 disabled:opacity-50">Previous</button>
-                    <button className="px-3 py-1 bg-[#0d6efd] text-white border-r border-gray-300">{currentPage}</button>
-                    <button onClick={() => setCurrentPage(Math.min(totalPages, currentPage + 1))} disabled={currentPage === totalPages || totalPages === 0} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 disabled:opacity-50">Next</button>
+                    <button onClick={productPage.previous} disabled={!productPage.hasPrevious} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 border-r border-gray-300 disabled:opacity-50">Previous</button>
+                    <button className="px-3 py-1 bg-[#0d6efd] text-white border-r border-gray-300">{productPage.page}</button>
+                    <button onClick={productPage.next} disabled={!productPage.hasNext} className="px-3 py-1 bg-white hover:bg-gray-100 text-gray-500 disabled:opacity-50">Next</button>
                 </div>
             </div>
         </div>
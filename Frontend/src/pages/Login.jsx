@@ -30,6 +30,8 @@ const Login = () => {
     } catch (error) {
         if (error.response && error.response.status === 401) {
             setErrorMessage("Username atau Password salah!");
+        } else if (error.response && error.response.status === 429) {
+            setErrorMessage("Terlalu banyak percobaan login. Coba lagi beberapa saat lagi.");
         } else {
             setErrorMessage("Gagal Login. Periksa koneksi server.");
         }
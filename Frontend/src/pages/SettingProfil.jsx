@@ -61,7 +61,10 @@ const SettingProfil = () => {
   const handleChangePassword = async () => {
       if (passForm.new_password !== passForm.confirm_password) { triggerError("Password konfirmasi tidak cocok!"); return; }
       try { 
-          await api.put('/users/profile/change-password/', passForm); 
+          const response = await api.put('/users/profile/change-password/', passForm); 
+          // Sesi lama dicabut server: simpan token baru dari respons
+          localStorage.setItem('access_token', response.data.access);
+          localStorage.setItem('refresh_token', response.data.refresh);
           triggerSuccess("Kata sandi berhasil diubah!"); 
           setPassForm({ old_password: '', new_password: '', confirm_password: '' }); 
           setShowModalPassword(false); 
@@ -78,7 +81,7 @@ const SettingProfil = () => {
           const response = await api.put('/users/profile/upload-image/', formData, { headers: { 'Content-Type': 'multipart/form-data' } }); 
           triggerSuccess("Foto berhasil diganti!"); 
           window.dispatchEvent(new Event('profile-updated')); 
-          setUserData({ ...userData, image_url: response.data.image_url }); 
+          setUserData({ ...userData, image_url: response.data.image_url, image_urls: response.data.image_urls }); 
           setShowModalFoto(false); 
           setSelectedFile(null); 
           setFileName("Tidak ada file yang dipilih");
@@ -144,7 +147,7 @@ const SettingProfil = () => {
             <div className="bg-white shadow-md rounded-sm border-t-4 border-t-[#0d6efd] p-6 flex items-center justify-center">
                 <div className="w-48 h-48 rounded-full overflow-hidden border-4 border-gray-200">
                     <img 
-                        src={userData.image_url ? `${userData.image_url}` : "https://via.placeholder.com/150"} 
+                        src={userData.image_urls?.['256'] || userData.image_url || "https://via.placeholder.com/150"} 
                         alt="Profile" 
                         className="w-full h-full object-cover"
                         onError={(e) => { e.target.src = "https://via.placeholder.com/150"; }} 